@@ -1,5 +1,16 @@
 from logging import getLogger, FileHandler, StreamHandler, INFO, basicConfig
-from asyncio import get_event_loop, create_task, gather
+from asyncio import get_event_loop, set_event_loop_policy, create_task, gather
+
+# The bot, the web server and the stream handlers all share one loop; use
+# libuv's when available. Set before pyrogram is imported, as it grabs the
+# current loop at import time
+try:
+    import uvloop
+    set_event_loop_policy(uvloop.EventLoopPolicy())
+except ImportError:
+    pass
+
+from concurrent.futures import ThreadPoolExecutor
 from traceback import format_exc
 from pyrogram import idle, Client
 from web import serve
@@ -24,6 +35,8 @@ basicConfig(
 )
 
 loop = get_event_loop()
+# asyncio.to_thread / run_in_executor(None, ...) pool: Mongo calls and title parsing
+loop.set_default_executor(ThreadPoolExecutor(max_workers=32, thread_name_prefix="reelnn"))
 LOGGER = getLogger(__name__)
 LOGGER.setLevel(INFO)
 
@@ -112,6 +125,10 @@ async def initialize_clients():
 # This code is adapted from Surf-TG by weebzone (GitHub Username)
 # Source: https://github.com/weebzone/Surf-TG
 async def init():
+    # Shared TMDb session, opened before any handler builds a TMDb route
+    from utils.tmdb import open_tmdb_session
+    open_tmdb_session()
+
     await bot.start()
     LOGGER.info(f"Bot Started Successfully!")
 
@@ -146,6 +163,14 @@ async def handle_cache_crash(task):
 async def stop_clients():
     LOGGER.info("Stopping all clients ...")
     await send_info(bot, "Stopping all clients ...")
+    # Buffered upserts must reach Mongo before the connection is closed
+    from plugins.video_message import flush_writes
+    try:
+        await flush_writes()
+    except Exception:
+        LOGGER.exception("Final write flush failed")
+    from utils.tmdb import close_tmdb_session
+    await close_tmdb_session()
     await shutdowndb()
     await bot.stop()
     for client_id, client in multi_clients.items():
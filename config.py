@@ -30,6 +30,8 @@ MULTI_TOKENS = {
 DELETE_AFTER_MINUTES = 10 # Set the number of minutes after which files will be deleted from user message
 POST_UPDATES = True # Set to True if you want to post updates in the post chat
 USE_CAPTION = False # Set to True if you want to use captions for posts instead of file names.
+TG_RATE_LIMIT = 25 # Max outbound Telegram API calls per second (shared by batch and /start handlers)
+TG_RATE_BURST = 30 # Max calls allowed in one burst before throttling kicks in
 
 # Port configuration
 import os
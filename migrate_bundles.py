@@ -1,38 +1,83 @@
 # migrate_bundles.py
 import asyncio
+from collections import defaultdict
+from pymongo import UpdateOne
 from pyrogram import Client
 from utils.db_utils.bundle_db import BundleDatabase
+from utils.ratelimit import GET_MESSAGES_LIMIT
 import config
 
+CHUNK_SIZE = GET_MESSAGES_LIMIT
+
+# Chunks fetched/written at the same time
+MAX_CONCURRENT_CHUNKS = 16
+
 db = BundleDatabase()
-app = Client("migrate_bot", api_id=config.API_ID, api_hash=config.API_HASH, bot_token=config.BOT_TOKEN)
+app = Client(
+    "migrate_bot",
+    api_id=config.API_ID,
+    api_hash=config.API_HASH,
+    bot_token=config.BOT_TOKEN,
+    workers=32,
+    max_concurrent_transmissions=4,
+    sleep_threshold=60,  # FloodWaits up to 60s are slept through by Pyrogram
+)
+
+async def migrate_chunk(chat_id, index, chunk, semaphore):
+    """Fetch one chunk of messages and write its hashes; returns the modified count"""
+    async with semaphore:
+        try:
+            msg_ids = [int(b['msg_id']) for b in chunk]
+            messages = await app.get_messages(chat_id, msg_ids)
+
+            ops = []
+            for bundle, msg in zip(chunk, messages):
+                if msg and (msg.video or msg.document):
+                    media = msg.video or msg.document
+                    file_unique_id = media.file_unique_id
+                    file_hash = file_unique_id[:6] # Generate Hash
+
+                    ops.append(UpdateOne(
+                        {"_id": bundle["_id"]},
+                        {"$set": {"file_hash": file_hash, "file_unique_id": file_unique_id}}
+                    ))
+
+            modified = 0
+            if ops:
+                result = await asyncio.to_thread(db.collection.bulk_write, ops, ordered=False)
+                modified = result.modified_count
+            print(f"Chat {chat_id}: updated {len(ops)}/{len(chunk)} bundles in chunk")
+            return modified
+        except Exception as e:
+            print(f"Error in chat {chat_id} chunk {index}: {e}")
+            return 0
 
 async def migrate():
     async with app:
         print("Starting Bundle Migration...")
         # Find bundles missing the hash
-        bundles = list(db.collection.find({"file_hash": {"$exists": False}}))
+        bundles = list(db.collection.find(
+            {"file_hash": {"$exists": False}},
+            {"_id": 1, "chat_id": 1, "msg_id": 1, "title": 1}
+        ))
         print(f"Found {len(bundles)} bundles to update.")
-        
+
+        # Group by chat so each chunk is a single get_messages call
+        by_chat = defaultdict(list)
         for bundle in bundles:
             try:
-                chat_id = int(bundle['chat_id'])
-                msg_id = int(bundle['msg_id'])
-                
-                msg = await app.get_messages(chat_id, msg_id)
-                if msg and (msg.video or msg.document):
-                    media = msg.video or msg.document
-                    file_unique_id = media.file_unique_id
-                    file_hash = file_unique_id[:6] # Generate Hash
-                    
-                    db.collection.update_one(
-                        {"_id": bundle["_id"]},
-                        {"$set": {"file_hash": file_hash, "file_unique_id": file_unique_id}}
-                    )
-                    print(f"Updated: {bundle.get('title')[:20]} -> {file_hash}")
-                await asyncio.sleep(0.2)
-            except Exception as e:
-                print(f"Error: {e}")
+                by_chat[int(bundle['chat_id'])].append(bundle)
+            except (KeyError, TypeError, ValueError):
+                print(f"Skipping bundle with invalid chat_id: {bundle.get('_id')}")
+
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_CHUNKS)
+        results = await asyncio.gather(*(
+            migrate_chunk(chat_id, i // CHUNK_SIZE, chat_bundles[i:i + CHUNK_SIZE], semaphore)
+            for chat_id, chat_bundles in by_chat.items()
+            for i in range(0, len(chat_bundles), CHUNK_SIZE)
+        ))
+
+        print(f"Migration finished. Updated {sum(results)} bundles.")
 
 if __name__ == "__main__":
-    asyncio.run(migrate())
\ No newline at end of file
+    asyncio.run(migrate())
@@ -1,15 +1,104 @@
 from pyrogram import Client, filters
 from pyrogram.types import Message
+from pyrogram.errors import FloodWait
 import re
 import asyncio
-import random
 import config
 
 from app import LOGGER
 from utils.telegram_logger import send_info, send_error, send_warning
-from plugins.video_message import message_queue, start_workers
+from utils.ratelimit import GET_MESSAGES_LIMIT, TG_BUCKET, tg_call
+from plugins.video_message import enqueue, pending_count
+
+TELEGRAM_LINK_RE = re.compile(r"https://t\.me/(?:c/)?([^/]+)/(\d+)")
+
+BATCH_CHUNK_SIZE = GET_MESSAGES_LIMIT
+BATCH_MAX_IN_FLIGHT = 4
+# Progress edits are coalesced to at most one per this many seconds
+PROGRESS_INTERVAL = 3
+
+
+def chunked(items, size):
+    """Yield successive slices of at most size items"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+async def iter_message_range(client: Client, chat_id, start_id: int, end_id: int):
+    """
+    Stream messages start_id..end_id in id order.
+
+    Bots cannot use get_chat_history (messages.getHistory is user-only),
+    so the range is fetched as 200-id get_messages chunks, several per
+    wave. The wave size backs off on FloodWait (x0.5) and recovers (+0.5);
+    that is the only place this sleeps. Ids that no longer exist come
+    back as empty messages and are skipped. A chunk that fails with any
+    other error is reported and skipped.
+    """
+    pending = list(enumerate(chunked(range(start_id, end_id + 1), BATCH_CHUNK_SIZE)))
+    in_flight = float(BATCH_MAX_IN_FLIGHT)
+    # Chunks fetched out of order (after a FloodWait retry) wait here until
+    # every earlier chunk has been yielded
+    fetched = {}
+    next_chunk = 0
+
+    while pending:
+        wave = pending[:int(in_flight)]
+        del pending[:len(wave)]
+
+        results = await asyncio.gather(
+            *(tg_call(TG_BUCKET, client.get_messages, chat_id, list(ids)) for _, ids in wave),
+            return_exceptions=True
+        )
+
+        retry = []
+        flood_wait = 0
+        for (index, ids), result in zip(wave, results):
+            if isinstance(result, FloodWait):
+                flood_wait = max(flood_wait, result.value)
+                retry.append((index, ids))
+                continue
+
+            if isinstance(result, Exception):
+                LOGGER.error(f"Batch error at messages {ids[0]}-{ids[-1]}: {result}")
+                await send_warning(
+                    client,
+                    f"Batch error at messages {ids[0]}-{ids[-1]}: {result}"
+                )
+                result = []
+
+            fetched[index] = result
+
+        while next_chunk in fetched:
+            for msg in fetched.pop(next_chunk):
+                if msg and not msg.empty:
+                    yield msg
+            next_chunk += 1
+
+        if flood_wait:
+            pending[:0] = retry
+            in_flight = max(1.0, in_flight * 0.5)
+            LOGGER.warning(f"FloodWait detected during batch, sleeping {flood_wait}s")
+            await asyncio.sleep(flood_wait)
+        else:
+            in_flight = min(float(BATCH_MAX_IN_FLIGHT), in_flight + 0.5)
+
+
+async def progress_updater(status_message: Message, latest_status: dict):
+    """Edit status_message with the newest progress text, at most every PROGRESS_INTERVAL"""
+    last_sent = None
+    while True:
+        text = latest_status["text"]
+        if text and text != last_sent:
+            try:
+                await tg_call(TG_BUCKET, status_message.edit_text, text)
+                last_sent = text
+            except FloodWait as e:
+                await asyncio.sleep(e.value)
+            except Exception as e:
+                LOGGER.warning(f"Batch progress update failed: {e}")
+        await asyncio.sleep(PROGRESS_INTERVAL)
 
-TELEGRAM_LINK_PATTERN = r"https://t\.me/(?:c/)?([^/]+)/(\d+)"
 
 @Client.on_message(filters.command("batch") & filters.user(config.SUDO_USERS))
 async def batch_process(client: Client, message: Message):
@@ -24,7 +113,9 @@ async def batch_process(client: Client, message: Message):
         # 1. Validate input
         # -----------------------------
         if len(message.command) < 3:
-            await message.reply_text(
+            await tg_call(
+                TG_BUCKET,
+                message.reply_text,
                 "⚠️ Please provide both start and end message links.\n\n"
                 "Example:\n"
                 "/batch https://t.me/c/123456789/100 https://t.me/c/123456789/200"
@@ -34,18 +125,18 @@ async def batch_process(client: Client, message: Message):
         start_link = message.command[1]
         end_link = message.command[2]
 
-        start_match = re.match(TELEGRAM_LINK_PATTERN, start_link)
-        end_match = re.match(TELEGRAM_LINK_PATTERN, end_link)
+        start_match = TELEGRAM_LINK_RE.match(start_link)
+        end_match = TELEGRAM_LINK_RE.match(end_link)
 
         if not start_match or not end_match:
-            await message.reply_text("⚠️ Invalid Telegram message link format.")
+            await tg_call(TG_BUCKET, message.reply_text, "⚠️ Invalid Telegram message link format.")
             return
 
         start_chat, start_id = start_match.groups()
         end_chat, end_id = end_match.groups()
 
         if start_chat != end_chat:
-            await message.reply_text("⚠️ Both links must be from the same chat.")
+            await tg_call(TG_BUCKET, message.reply_text, "⚠️ Both links must be from the same chat.")
             return
 
         chat_id = int(f"-100{start_chat}") if start_chat.isdigit() else start_chat
@@ -58,11 +149,11 @@ async def batch_process(client: Client, message: Message):
         total_messages = end_id - start_id + 1
 
         # -----------------------------
-        # 2. Start workers (NO cache updates during batch)
+        # 2. Announce (NO cache updates during batch)
         # -----------------------------
-        await start_workers(update_cache=False)
-
-        status_message = await message.reply_text(
+        status_message = await tg_call(
+            TG_BUCKET,
+            message.reply_text,
             f"🔄 Starting batch processing\n\n"
             f"Chat: {chat_id}\n"
             f"Range: {start_id} → {end_id}\n"
@@ -78,52 +169,40 @@ async def batch_process(client: Client, message: Message):
         # 3. Iterate messages & enqueue media
         # -----------------------------
         queued = 0
+        checked = 0
 
-        for current_msg_id in range(start_id, end_id + 1):
-            try:
-                msg = await client.get_messages(chat_id, current_msg_id)
+        latest_status = {"text": None}
+        updater = asyncio.create_task(progress_updater(status_message, latest_status))
+        try:
+            async for msg in iter_message_range(client, chat_id, start_id, end_id):
+                checked += 1
 
-                if msg and (msg.video or msg.document or msg.animation):
-                    await message_queue.put((client, msg))
+                if msg.video or msg.document or msg.animation:
+                    # Waits while the chat queue is full
+                    await enqueue(client, msg, update_cache=False)
                     queued += 1
 
-                # Telegram-safe delay (NOT too slow)
-                await asyncio.sleep(random.uniform(1.2, 2.5))
-
-                # Progress update every 25 messages
-                if current_msg_id % 25 == 0:
-                    await status_message.edit_text(
+                # Progress text every 25 messages; progress_updater sends it
+                if checked % 25 == 0:
+                    latest_status["text"] = (
                         f"🔄 Batch in progress\n\n"
-                        f"Checked: {current_msg_id - start_id + 1}/{total_messages}\n"
+                        f"Checked: {checked}/{total_messages}\n"
                         f"Queued media: {queued}\n"
-                        f"Current queue size: {message_queue.qsize()}"
+                        f"Current queue size: {pending_count()}"
                     )
-
-            except Exception as e:
-                err = str(e).lower()
-
-                if "message_not_found" in err or "message not found" in err:
-                    continue
-
-                if "flood_wait" in err:
-                    LOGGER.warning("FloodWait detected during batch, sleeping 5s")
-                    await asyncio.sleep(5)
-                    continue
-
-                LOGGER.error(f"Batch error at message {current_msg_id}: {e}")
-                await send_warning(
-                    client,
-                    f"Batch error at message {current_msg_id}: {e}"
-                )
+        finally:
+            updater.cancel()
 
         # -----------------------------
         # 4. Final status
         # -----------------------------
-        await status_message.edit_text(
+        await tg_call(
+            TG_BUCKET,
+            status_message.edit_text,
             f"✅ Batch completed successfully\n\n"
             f"Messages checked: {total_messages}\n"
             f"Media queued: {queued}\n"
-            f"Final queue size: {message_queue.qsize()}\n\n"
+            f"Final queue size: {pending_count()}\n\n"
             f"🔄 Workers are processing the queue."
         )
 
@@ -135,4 +214,4 @@ async def batch_process(client: Client, message: Message):
     except Exception as e:
         LOGGER.exception(e)
         await send_error(client, "Batch processing failed", e)
-        await message.reply_text(f"❌ Batch failed: {e}")
\ No newline at end of file
+        await tg_call(TG_BUCKET, message.reply_text, f"❌ Batch failed: {e}")
\ No newline at end of file
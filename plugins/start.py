@@ -5,26 +5,77 @@ from utils.db_utils.movie_db import MovieDatabase
 from utils.db_utils.show_db import ShowDatabase
 from utils.db_utils.bundle_db import BundleDatabase
 import asyncio
+import heapq
+import itertools
 import logging
+import re
+import time
+from collections import defaultdict
 import config
+from utils.ratelimit import TG_BUCKET, tg_call
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 LOGGER = logging.getLogger(__name__)
 
-scheduled_deletions = {}
+# Pending auto-deletes as (expiry, seq, chat_id, message_id, client);
+# one worker sleeps until the earliest expiry and deletes in batches
+_deletion_heap = []
+_deletion_seq = itertools.count()
+_deletion_event = asyncio.Event()
+_deletion_worker = None
 
-async def delete_after_delay(client, chat_id, message_id, delay_seconds):
+# /start file_<id>_<m|s>_<quality>_<season>_<episode>
+_FILE_RE = re.compile(r"^/start file_(\d+)_([ms])_(\d+)_(\d+)_(\d+)(?:\s|$)")
+
+# Telegram accepts at most 100 ids per delete_messages call
+DELETE_BATCH_SIZE = 100
+
+movie_db = MovieDatabase()
+show_db = ShowDatabase()
+bundle_db = BundleDatabase()
+
+def schedule_deletion(client, chat_id, message_id, delay_seconds):
     """Delete a message after specified delay"""
-    try:
-        await asyncio.sleep(delay_seconds)
-        await client.delete_messages(chat_id, message_id)
-        LOGGER.info(f"Auto-deleted message {message_id} in chat {chat_id}")
-        
-        if (chat_id, message_id) in scheduled_deletions:
-            del scheduled_deletions[(chat_id, message_id)]
-    except Exception as e:
-        LOGGER.error(f"Error deleting message {message_id} in chat {chat_id}: {str(e)}")
+    global _deletion_worker
+    heapq.heappush(
+        _deletion_heap,
+        (time.monotonic() + delay_seconds, next(_deletion_seq), chat_id, message_id, client)
+    )
+    _deletion_event.set()
+    if _deletion_worker is None or _deletion_worker.done():
+        _deletion_worker = asyncio.create_task(deletion_worker())
+
+async def deletion_worker():
+    while True:
+        _deletion_event.clear()
+        if not _deletion_heap:
+            await _deletion_event.wait()
+            continue
+
+        delay = _deletion_heap[0][0] - time.monotonic()
+        if delay > 0:
+            # Wake early if a new deletion is scheduled
+            try:
+                await asyncio.wait_for(_deletion_event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        now = time.monotonic()
+        due = defaultdict(list)
+        while _deletion_heap and _deletion_heap[0][0] <= now:
+            _, _, chat_id, message_id, client = heapq.heappop(_deletion_heap)
+            due[(client, chat_id)].append(message_id)
+
+        for (client, chat_id), message_ids in due.items():
+            for i in range(0, len(message_ids), DELETE_BATCH_SIZE):
+                batch = message_ids[i:i + DELETE_BATCH_SIZE]
+                try:
+                    await tg_call(TG_BUCKET, client.delete_messages, chat_id, batch)
+                    LOGGER.info(f"Auto-deleted {len(batch)} message(s) in chat {chat_id}")
+                except Exception as e:
+                    LOGGER.error(f"Error deleting messages {batch} in chat {chat_id}: {str(e)}")
 
 # --- Filters ---
 
@@ -36,6 +87,54 @@ BUNDLE_FILTER = filters.private & filters.create(
     lambda _, __, msg: msg.text and msg.text.startswith("/start bundle_")
 )
 
+# --- Deferred status message ---
+
+PROCESSING_TEXT = "Processing your request, please wait..."
+# Only show PROCESSING_TEXT when a request takes longer than this
+PROCESSING_DELAY = 0.5
+
+class DeferredStatus:
+    """
+    Status message that is only sent when a request is slow.
+
+    Until it is sent, edit_text() replies to the request instead and
+    delete()/update() do nothing, so fast requests skip the extra
+    Telegram round-trips. Every call it makes goes through tg_call.
+    """
+
+    def __init__(self, message: Message):
+        self.message = message
+        self.sent = None
+        self._lock = asyncio.Lock()
+
+    async def run(self, coro):
+        task = asyncio.create_task(coro)
+        try:
+            await asyncio.wait_for(asyncio.shield(task), PROCESSING_DELAY)
+        except asyncio.TimeoutError:
+            async with self._lock:
+                if self.sent is None and not task.done():
+                    self.sent = await tg_call(TG_BUCKET, self.message.reply_text, PROCESSING_TEXT)
+            await task
+
+    async def edit_text(self, text: str):
+        async with self._lock:
+            if self.sent is None:
+                self.sent = await tg_call(TG_BUCKET, self.message.reply_text, text)
+            else:
+                await tg_call(TG_BUCKET, self.sent.edit_text, text)
+
+    async def update(self, text: str):
+        """Progress text, only worth a call if the status is already visible"""
+        async with self._lock:
+            if self.sent is not None:
+                await tg_call(TG_BUCKET, self.sent.edit_text, text)
+
+    async def delete(self):
+        async with self._lock:
+            if self.sent is not None:
+                await tg_call(TG_BUCKET, self.sent.delete)
+
 # --- Handlers ---
 
 @Client.on_message(BUNDLE_FILTER)
@@ -44,82 +143,83 @@ async def forward_bundle(client: Client, message: Message):
     Handle bundle download requests (Season Packs)
     Link format: https://t.me/bot?start=bundle_<file_hash>
     """
+    processing_msg = DeferredStatus(message)
     try:
         LOGGER.info(f"Bot received bundle command: {message.text}")
-        processing_msg = await message.reply_text("Processing your request, please wait...")
-        
-        try:
-            # Extract Hash/ID
-            command_args = message.text.split("bundle_")[1]
-            identifier = command_args.split("&")[0].split()[0].strip()
-            
-            LOGGER.info(f"Extracted identifier: {identifier}")
-        except IndexError:
-             await processing_msg.edit_text("Invalid bundle link format.")
-             return
-
-        # Look up bundle in DB
-        LOGGER.info("Querying BundleDatabase...")
-        bundle_db = BundleDatabase()
-        bundle = bundle_db.get_bundle_by_hash_or_id(identifier)
-        
-        if not bundle:
-            LOGGER.warning(f"Bundle NOT found in DB for: {identifier}")
-            await processing_msg.edit_text("Sorry, bundle not found in database.")
-            return
-
-        LOGGER.info(f"Bundle found: {bundle.get('title', 'Unknown Title')}")
-        await processing_msg.edit_text("Found your bundle! Forwarding it now...")
-
-        # Get details
-        try:
-            chat_id = int(bundle.get("chat_id"))
-            msg_id = int(bundle.get("msg_id"))
-            LOGGER.info(f"Targeting Chat: {chat_id}, Message: {msg_id}")
-        except (ValueError, TypeError):
-            LOGGER.error(f"Invalid chat_id/msg_id in DB: {bundle}")
-            await processing_msg.edit_text("Error: Invalid bundle data.")
-            return
-
-        # Forward the file
-        try:
-            # First, try get_messages to verify access/existence
-            # This helps wake up the peer for the bot if needed
-            # await client.get_messages(chat_id, msg_id) 
-            
-            forwarded_msg = await client.forward_messages(
-                chat_id=message.chat.id,
-                from_chat_id=chat_id,
-                message_ids=msg_id,
-                drop_author=True
-            )
-            LOGGER.info("Message forwarded successfully")
-        except PeerIdInvalid:
-            LOGGER.error(f"PeerIdInvalid: Bot hasn't seen chat {chat_id}")
-            await processing_msg.edit_text("Error: Bot cannot access the source channel. Make sure the bot is an admin there.")
-            return
-        except ChannelPrivate:
-            LOGGER.error(f"ChannelPrivate: Bot kicked or not admin in {chat_id}")
-            await processing_msg.edit_text("Error: Source channel is private and bot cannot access it.")
-            return
-        except Exception as e:
-            LOGGER.error(f"Failed to forward message: {e}")
-            await processing_msg.edit_text("Error: Could not forward the file. Please report this.")
-            return
-
-        # Schedule auto-delete
-        task = asyncio.create_task(delete_after_delay(client, message.chat.id, forwarded_msg.id, 60*config.DELETE_AFTER_MINUTES))
-        scheduled_deletions[(message.chat.id, forwarded_msg.id)] = task
-
-        await message.reply_text("Please forward this file to your saved messages. This file will be deleted in 10 minutes.")
-        await processing_msg.delete()
+        await processing_msg.run(_forward_bundle(client, message, processing_msg))
 
     except Exception as e:
         LOGGER.exception(f"Unhandled error in forward_bundle")
-        if 'processing_msg' in locals():
-            await processing_msg.edit_text("Sorry, a critical error occurred.")
-        else:
-            await message.reply_text("Sorry, a critical error occurred.")
+        await processing_msg.edit_text("Sorry, a critical error occurred.")
+
+async def _forward_bundle(client: Client, message: Message, processing_msg: DeferredStatus):
+    try:
+        # Extract Hash/ID
+        command_args = message.text.split("bundle_")[1]
+        identifier = command_args.split("&")[0].split()[0].strip()
+
+        LOGGER.info(f"Extracted identifier: {identifier}")
+    except IndexError:
+         await processing_msg.edit_text("Invalid bundle link format.")
+         return
+
+    # Look up bundle in DB
+    LOGGER.info("Querying BundleDatabase...")
+    bundle = await asyncio.to_thread(bundle_db.get_bundle_by_hash_or_id, identifier)
+
+    if not bundle:
+        LOGGER.warning(f"Bundle NOT found in DB for: {identifier}")
+        await processing_msg.edit_text("Sorry, bundle not found in database.")
+        return
+
+    LOGGER.info(f"Bundle found: {bundle.get('title', 'Unknown Title')}")
+    await processing_msg.update("Found your bundle! Forwarding it now...")
+
+    # Get details
+    try:
+        chat_id = int(bundle.get("chat_id"))
+        msg_id = int(bundle.get("msg_id"))
+        LOGGER.info(f"Targeting Chat: {chat_id}, Message: {msg_id}")
+    except (ValueError, TypeError):
+        LOGGER.error(f"Invalid chat_id/msg_id in DB: {bundle}")
+        await processing_msg.edit_text("Error: Invalid bundle data.")
+        return
+
+    # Forward the file
+    try:
+        # First, try get_messages to verify access/existence
+        # This helps wake up the peer for the bot if needed
+        # await client.get_messages(chat_id, msg_id) 
+
+        forwarded_msg = await tg_call(
+            TG_BUCKET,
+            client.forward_messages,
+            chat_id=message.chat.id,
+            from_chat_id=chat_id,
+            message_ids=msg_id,
+            drop_author=True
+        )
+        LOGGER.info("Message forwarded successfully")
+    except PeerIdInvalid:
+        LOGGER.error(f"PeerIdInvalid: Bot hasn't seen chat {chat_id}")
+        await processing_msg.edit_text("Error: Bot cannot access the source channel. Make sure the bot is an admin there.")
+        return
+    except ChannelPrivate:
+        LOGGER.error(f"ChannelPrivate: Bot kicked or not admin in {chat_id}")
+        await processing_msg.edit_text("Error: Source channel is private and bot cannot access it.")
+        return
+    except Exception as e:
+        LOGGER.error(f"Failed to forward message: {e}")
+        await processing_msg.edit_text("Error: Could not forward the file. Please report this.")
+        return
+
+    # Schedule auto-delete
+    schedule_deletion(client, message.chat.id, forwarded_msg.id, 60*config.DELETE_AFTER_MINUTES)
+
+    await asyncio.gather(
+        tg_call(TG_BUCKET, message.reply_text, "Please forward this file to your saved messages. This file will be deleted in 10 minutes."),
+        processing_msg.delete()
+    )
 
 
 @Client.on_message(LINK_FLITER, -2)
@@ -127,110 +227,93 @@ async def forward_(client: Client, message: Message):
     """
     Handle standard episode/movie download requests
     """
+    processing_msg = DeferredStatus(message)
     try:
-        processing_msg = await message.reply_text("Processing your request, please wait...")
-        
-        token = message.text.split("file_")[1]
-        details = token.split("_")
-        
-        if len(details) < 5:
-            await processing_msg.edit_text("Invalid file link format.")
-            return
-            
-        id = details[0]
-        media_type = details[1]
-        quality = details[2]
-        season = details[3]
-        episode = details[4]
-
-        if media_type == "m":  
-            movie_db = MovieDatabase()
-            try:
-                movie = movie_db.find_movie_by_id(int(id))
-                if not movie:
-                    await processing_msg.edit_text("Sorry, movie not found.")
-                    return
-                    
-                file_data = movie["quality"][int(quality)]
-                        
-                if not file_data or "msg_id" not in file_data or "chat_id" not in file_data:
-                    await processing_msg.edit_text(f"Sorry, {quality} quality not available for this movie.")
-                    return
-                
-                await processing_msg.edit_text("Found your file! Forwarding it now...")
-                
-                forwarded_msg = await client.forward_messages(
-                    chat_id=message.chat.id,
-                    from_chat_id=file_data["chat_id"],
-                    message_ids=file_data["msg_id"],
-                    drop_author=True
-                )
-                
-                task = asyncio.create_task(delete_after_delay(client, message.chat.id, forwarded_msg.id, 60*config.DELETE_AFTER_MINUTES))
-                scheduled_deletions[(message.chat.id, forwarded_msg.id)] = task
-
-                await message.reply_text("Please forward this file to your saved messages. This file will be deleted in 10 minutes.")
-                await processing_msg.delete()
-                
-            finally:
-                pass
-                
-        elif media_type == "s":  
-            show_db = ShowDatabase()
-            try:
-                show = show_db.find_show_by_id(int(id))
-                if not show:
-                    await processing_msg.edit_text("Sorry, show not found.")
-                    return
-                    
-                season_data = None
-                for s in show.get("season", []):
-                    if s["season_number"] == int(season):
-                        season_data = s
-                        break
-                        
-                if not season_data:
-                    await processing_msg.edit_text(f"Sorry, season {season} not found for this show.")
-                    return
-                    
-                episode_data = None
-                for e in season_data.get("episodes", []):
-                    if e["episode_number"] == int(episode):
-                        episode_data = e
-                        break
-                        
-                if not episode_data:
-                    await processing_msg.edit_text(f"Sorry, episode {episode} not found in season {season}.")
-                    return
-                    
-                file_data = episode_data["quality"][int(quality)]
-                        
-                if not file_data or "msg_id" not in file_data or "chat_id" not in file_data:
-                    await processing_msg.edit_text(f"Sorry, {quality} quality not available for this episode.")
-                    return
-                
-                await processing_msg.edit_text("Found your file! Forwarding it now...")
-                
-                forwarded_msg = await client.forward_messages(
-                    chat_id=message.chat.id,
-                    from_chat_id=file_data["chat_id"],
-                    message_ids=file_data["msg_id"],
-                    drop_author=True
-                )
-                
-                task = asyncio.create_task(delete_after_delay(client, message.chat.id, forwarded_msg.id, 60*config.DELETE_AFTER_MINUTES))
-                scheduled_deletions[(message.chat.id, forwarded_msg.id)] = task
-
-                await processing_msg.delete()
-                
-            finally:
-                pass
-                
-        else:
-            await processing_msg.edit_text("Invalid media type. Expected 'm' for movie or 's' for show.")
-            
+        await processing_msg.run(_forward_file(client, message, processing_msg))
+
     except Exception as e:
-        if 'processing_msg' in locals():
-            await processing_msg.edit_text(f"Sorry, an error occurred while processing your request.")
-        else:
-            await message.reply_text(f"Sorry, an error occurred while processing your request.")
\ No newline at end of file
+        await processing_msg.edit_text(f"Sorry, an error occurred while processing your request.")
+
+async def _forward_file(client: Client, message: Message, processing_msg: DeferredStatus):
+    match = _FILE_RE.match(message.text)
+    if not match:
+        await processing_msg.edit_text("Invalid file link format.")
+        return
+
+    id, media_type = int(match[1]), match[2]
+    quality, season, episode = int(match[3]), int(match[4]), int(match[5])
+
+    if media_type == "m":  
+        try:
+            movie = await asyncio.to_thread(movie_db.find_movie_by_id, id)
+            if not movie:
+                await processing_msg.edit_text("Sorry, movie not found.")
+                return
+
+            file_data = movie["quality"][quality]
+
+            if not file_data or "msg_id" not in file_data or "chat_id" not in file_data:
+                await processing_msg.edit_text(f"Sorry, {quality} quality not available for this movie.")
+                return
+
+            await processing_msg.update("Found your file! Forwarding it now...")
+
+            forwarded_msg = await tg_call(
+                TG_BUCKET,
+                client.forward_messages,
+                chat_id=message.chat.id,
+                from_chat_id=file_data["chat_id"],
+                message_ids=file_data["msg_id"],
+                drop_author=True
+            )
+
+            schedule_deletion(client, message.chat.id, forwarded_msg.id, 60*config.DELETE_AFTER_MINUTES)
+
+            await asyncio.gather(
+                tg_call(TG_BUCKET, message.reply_text, "Please forward this file to your saved messages. This file will be deleted in 10 minutes."),
+                processing_msg.delete()
+            )
+
+        finally:
+            pass
+
+    elif media_type == "s":  
+        try:
+            lookup = await asyncio.to_thread(
+                show_db.get_episode_file, id, season, episode, quality
+            )
+            if lookup["status"] == "show_not_found":
+                await processing_msg.edit_text("Sorry, show not found.")
+                return
+
+            if lookup["status"] == "season_not_found":
+                await processing_msg.edit_text(f"Sorry, season {season} not found for this show.")
+                return
+
+            if lookup["status"] == "episode_not_found":
+                await processing_msg.edit_text(f"Sorry, episode {episode} not found in season {season}.")
+                return
+
+            file_data = lookup.get("file")
+
+            if not file_data or "msg_id" not in file_data or "chat_id" not in file_data:
+                await processing_msg.edit_text(f"Sorry, {quality} quality not available for this episode.")
+                return
+
+            await processing_msg.update("Found your file! Forwarding it now...")
+
+            forwarded_msg = await tg_call(
+                TG_BUCKET,
+                client.forward_messages,
+                chat_id=message.chat.id,
+                from_chat_id=file_data["chat_id"],
+                message_ids=file_data["msg_id"],
+                drop_author=True
+            )
+
+            schedule_deletion(client, message.chat.id, forwarded_msg.id, 60*config.DELETE_AFTER_MINUTES)
+
+            await processing_msg.delete()
+
+        finally:
+            pass
@@ -1,7 +1,9 @@
+import re
+from collections import deque
 from pyrogram import Client, filters
 from pyrogram.types import Message
 from pyrogram.errors import FloodWait
-from asyncio import sleep, create_task, Queue
+from asyncio import sleep, create_task, gather, Event, Lock, Semaphore, wait_for, to_thread
 
 from app import LOGGER
 import config
@@ -19,17 +21,36 @@ from utils.bundle_detector import is_bundle, extract_bundle_info
 # ===============================
 # CONFIG
 # ===============================
-WORKER_COUNT = 2
+MAX_CHAT_WORKERS = 16
+WORKER_IDLE_TIMEOUT = 30
 PROCESS_DELAY = 1
 CACHE_DELAY = 30
+WRITE_FLUSH_SIZE = 100
+WRITE_FLUSH_INTERVAL = 2.0
+CHAT_QUEUE_SIZE = 1000
+FLOOD_RETRIES = 3
 
 # ===============================
 # GLOBALS
 # ===============================
-message_queue: Queue = Queue()
-worker_tasks = []
+# One queue + worker per chat: ordering is kept inside a chat while
+# different chats are processed in parallel
+_chat_queues: dict[int, "MessageQueue"] = {}
+_chat_workers = {}
+_worker_slots = Semaphore(MAX_CHAT_WORKERS)
+flusher_task = None
 cache_update_scheduled = False
 
+# Buffered bundle/movie upserts, written with one bulk_write each per flush
+bundle_write_buffer = []
+movie_write_buffer = []
+write_flush_event = Event()
+write_flush_lock = Lock()
+
+_VIDEO_EXT_RE = re.compile(r"\.(?:mkv|mp4|webm|avi|mov|flv|m4v)$", re.IGNORECASE)
+_SEASON_PACK_RE = re.compile(r"\.s\d{2}\.", re.IGNORECASE)
+_EPISODE_RE = re.compile(r"e\d{2}|episode", re.IGNORECASE)
+
 movie_db = MovieDatabase()
 show_db = ShowDatabase()
 bundle_db = BundleDatabase()
@@ -50,37 +71,215 @@ def is_valid_video(media) -> bool:
         return True
         
     # 2. Fallback to extension check for Documents
-    video_exts = ('.mkv', '.mp4', '.webm', '.avi', '.mov', '.flv', '.m4v')
-    if name.lower().endswith(video_exts):
+    if _VIDEO_EXT_RE.search(name):
         return True
         
     return False
 
 def is_season_pack(title: str) -> bool:
     """Legacy check for simple season packs"""
-    t = title.lower()
-    return ".s01." in t and "e01" not in t and "episode" not in t
+    return bool(_SEASON_PACK_RE.search(title)) and not _EPISODE_RE.search(title)
+
+def is_pending_write(file_unique_id, chat_id: int, msg_id: int) -> bool:
+    """Check the write buffers for this file, so a repost within one flush interval is skipped too"""
+    for data in bundle_write_buffer:
+        if (data["chat_id"], data["msg_id"]) == (chat_id, msg_id):
+            return True
+        if file_unique_id and data.get("file_unique_id") == file_unique_id and data.get("show_id") is not None:
+            return True
+    return any(
+        (q.get("chat_id"), q.get("msg_id")) == (chat_id, msg_id)
+        for data in movie_write_buffer
+        for q in data.get("quality", [])
+    )
+
+async def is_already_stored(file_unique_id, chat_id: int, msg_id: int) -> bool:
+    """Check the write buffers, then the bundle, movie and show collections for this file"""
+    if is_pending_write(file_unique_id, chat_id, msg_id):
+        return True
+
+    # Independent lookups: run them concurrently instead of three round-trips in a row
+    checks = [
+        to_thread(movie_db.has_file, chat_id, msg_id),
+        to_thread(show_db.has_file, chat_id, msg_id),
+    ]
+    if file_unique_id:
+        checks.append(to_thread(bundle_db.exists_by_unique_id, file_unique_id))
+    return any(await gather(*checks))
 
 # ===============================
 # WORKER SYSTEM
 # ===============================
-async def start_workers(update_cache: bool = True):
-    global worker_tasks
-    if worker_tasks:
-        return
-    LOGGER.info(f"Starting {WORKER_COUNT} video processing workers...")
-    for i in range(WORKER_COUNT):
-        task = create_task(process_video_queue(update_cache))
-        worker_tasks.append(task)
-
-async def process_video_queue(update_cache: bool):
+class MessageQueue:
+    """
+    Single-loop bounded FIFO: a deque plus "not empty"/"not full" events,
+    without the per-item futures of asyncio.Queue. put() waits while the
+    queue holds maxsize items. Unfinished items are counted for join(),
+    as with Queue.task_done().
+    """
+
+    def __init__(self, maxsize: int = CHAT_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._not_empty = Event()
+        self._not_full = Event()
+        self._not_full.set()
+        self._unfinished = 0
+        self._finished = Event()
+        self._finished.set()
+
+    async def put(self, item):
+        while len(self._items) >= self.maxsize:
+            self._not_full.clear()
+            await self._not_full.wait()
+        self.put_nowait(item)
+
+    def put_nowait(self, item):
+        self._items.append(item)
+        self._unfinished += 1
+        self._finished.clear()
+        self._not_empty.set()
+
+    async def get(self):
+        while not self._items:
+            self._not_empty.clear()
+            await self._not_empty.wait()
+        item = self._items.popleft()
+        self._not_full.set()
+        return item
+
+    def task_done(self):
+        self._unfinished -= 1
+        if self._unfinished <= 0:
+            self._unfinished = 0
+            self._finished.set()
+
+    async def join(self):
+        await self._finished.wait()
+
+    def qsize(self) -> int:
+        return len(self._items)
+
+    def empty(self) -> bool:
+        return not self._items
+
+async def enqueue(client: Client, message: Message, update_cache: bool = True):
+    """
+    Queue a message on its chat's queue and make sure a worker is running.
+    Waits while that queue is full, so bursts are held back at the source.
+    """
+    chat_id = message.chat.id
+    queue = _chat_queues.get(chat_id)
+    if queue is None:
+        queue = _chat_queues[chat_id] = MessageQueue()
+    _ensure_worker(chat_id)
+    await queue.put((client, message, update_cache))
+
+def pending_count() -> int:
+    return sum(queue.qsize() for queue in _chat_queues.values())
+
+async def join_queues():
+    """Wait until every chat queue has been fully processed"""
+    while _chat_queues:
+        await gather(*(queue.join() for queue in list(_chat_queues.values())))
+        if all(queue.empty() for queue in _chat_queues.values()):
+            return
+
+def _ensure_worker(chat_id: int):
+    global flusher_task
+    if flusher_task is None:
+        flusher_task = create_task(write_flusher())
+    if chat_id not in _chat_workers:
+        _chat_workers[chat_id] = create_task(process_chat_queue(chat_id))
+
+async def process_chat_queue(chat_id: int):
+    queue = _chat_queues[chat_id]
+    async with _worker_slots:
+        while True:
+            try:
+                client, message, update_cache = await wait_for(queue.get(), timeout=WORKER_IDLE_TIMEOUT)
+            except TimeoutError:
+                break
+            try:
+                await process_with_retry(client, message, update_cache)
+                await sleep(PROCESS_DELAY)
+            finally:
+                queue.task_done()
+
+    # Idle: retire the worker; a message that arrived meanwhile gets a new one
+    del _chat_workers[chat_id]
+    if queue.empty():
+        del _chat_queues[chat_id]
+    else:
+        _ensure_worker(chat_id)
+
+async def process_with_retry(client: Client, message: Message, update_cache: bool):
+    """Process a message, sleeping out FloodWaits in place instead of re-queueing"""
+    for attempt in range(FLOOD_RETRIES + 1):
+        try:
+            return await process_video(client, message, update_cache)
+        except FloodWait as e:
+            if attempt == FLOOD_RETRIES:
+                LOGGER.error(f"Giving up on message {message.id} in {message.chat.id} after {attempt} FloodWaits")
+                return
+            LOGGER.warning(f"FloodWait while processing {message.id}, sleeping {e.value}s")
+            await sleep(e.value)
+
+# ===============================
+# BUFFERED WRITES
+# ===============================
+def buffer_bundle(data: dict):
+    bundle_write_buffer.append(data)
+    if len(bundle_write_buffer) >= WRITE_FLUSH_SIZE:
+        write_flush_event.set()
+
+def buffer_movie(data: dict):
+    movie_write_buffer.append(data)
+    if len(movie_write_buffer) >= WRITE_FLUSH_SIZE:
+        write_flush_event.set()
+
+def _write_ids(items) -> str:
+    return ", ".join(
+        f"mid {d['mid']}" if "mid" in d else f"{d.get('chat_id')}/{d.get('msg_id')}"
+        for d in items
+    )
+
+async def flush_writes():
+    """Write all buffered upserts, one bulk_write per collection"""
+    async with write_flush_lock:
+        for name, buffer, bulk_upsert in (
+            ("Bundle", bundle_write_buffer, bundle_db.bulk_upsert_bundles),
+            ("Movie", movie_write_buffer, movie_db.bulk_upsert_movies),
+        ):
+            if not buffer:
+                continue
+            # The batch stays buffered until written, so is_pending_write
+            # still sees it mid-flush; new items are only ever appended
+            batch = buffer[:]
+
+            res = await to_thread(bulk_upsert, batch)
+            if res["status"] == "error":
+                # Nothing is known to be written: keep the batch for the next flush
+                LOGGER.error(f"{name} bulk write failed for {len(batch)} items, kept for retry ({_write_ids(batch)}): {res['message']}")
+                continue
+
+            del buffer[:len(batch)]
+            if res["status"] == "partial":
+                LOGGER.error(f"{name} bulk write: {res['message']} ({_write_ids(res['rejected'])})")
+            else:
+                LOGGER.info(f"Flushed {len(batch)} {name.lower()} upserts")
+
+async def write_flusher():
     while True:
-        client, message = await message_queue.get()
         try:
-            await process_video(client, message, update_cache)
-            await sleep(PROCESS_DELAY)
-        finally:
-            message_queue.task_done()
+            await wait_for(write_flush_event.wait(), timeout=WRITE_FLUSH_INTERVAL)
+        except TimeoutError:
+            pass
+        write_flush_event.clear()
+        try:
+            await flush_writes()
+        except Exception:
+            LOGGER.exception("Buffered write flush failed")
 
 # ===============================
 # PROCESSOR
@@ -96,11 +295,23 @@ async def process_video(client: Client, message: Message, update_cache: bool):
         if not is_valid_video(file):
             return
 
+        # FILE DETAILS (read once, used by every branch)
+        file_id = file.file_id
+        file_unique_id = getattr(file, "file_unique_id", None)
+        file_name = getattr(file, "file_name", "Unknown")
+        chat_id = message.chat.id
+        msg_id = message.id
+
+        # SKIP: already ingested (e.g. /batch over a processed channel)
+        if await is_already_stored(file_unique_id, chat_id, msg_id):
+            LOGGER.info(f"Skipping already stored message {msg_id} in {chat_id}")
+            return
+
         # TITLE RESOLUTION
         if config.USE_CAPTION:
             title = message.caption or message.text or ""
         else:
-            title = file.file_name or file.file_id
+            title = file_name or file_id
         
         title = remove_redandent(title)
 
@@ -135,35 +346,30 @@ async def process_video(client: Client, message: Message, update_cache: bool):
                         "season": [],
                     }
                     
-                    if not show_db.find_show_by_id(show["tmdb_id"]):
-                        show_db.insert_show(show_data)
-                    else:
-                        show_db.upsert_show(show_data)
-                        
+                    await to_thread(show_db.upsert_show_metadata, show_data)
+
                     show_id = show["tmdb_id"]
                 else:
                     LOGGER.warning(f"TMDB search failed for: '{search_title}'")
             except Exception as e:
                 LOGGER.exception(f"Bundle TMDB resolution failed: {e}")
 
-            # FILE DETAILS
-            file_unique_id = getattr(file, "file_unique_id", None)
             file_hash = file_unique_id[:6] if file_unique_id else None
             file_size = getattr(file, "file_size", 0)
 
-            # SAVE BUNDLE
-            bundle_db.upsert_bundle({
+            # SAVE BUNDLE (flushed in bulk by write_flusher)
+            buffer_bundle({
                 "title": title,
                 "show_id": show_id,
                 "season": bundle_info.get("season"),
                 "episode_range": bundle_info.get("episode_range") or "FULL SEASON",
-                "file_id": file.file_id,
+                "file_id": file_id,
                 "file_unique_id": file_unique_id, 
                 "file_hash": file_hash,           
                 "size": file_size,                 # ADDED SIZE
-                "file_name": getattr(file, "file_name", "Unknown"), # ADDED NAME
-                "chat_id": message.chat.id,
-                "msg_id": message.id,
+                "file_name": file_name, # ADDED NAME
+                "chat_id": chat_id,
+                "msg_id": msg_id,
                 "is_bundle": True,
                 "source": "telegram",
                 "note": bundle_info.get("note", "Auto-detected")
@@ -188,10 +394,11 @@ async def process_video(client: Client, message: Message, update_cache: bool):
         media_type = result["_type"]
 
         if media_type == "movie":
-            res = movie_db.upsert_movie(media_details)
-            await send_info(client, f" Movie {res['status']}: {media_details.get('title')}")
+            # Flushed in bulk by write_flusher
+            buffer_movie(media_details)
+            await send_info(client, f" Movie queued: {media_details.get('title')}")
         elif media_type == "show":
-            res = show_db.upsert_show(media_details)
+            res = await to_thread(show_db.upsert_show, media_details)
             await send_info(client, f" Show {res['status']}: {media_details.get('title')}")
 
         if config.POST_UPDATES:
@@ -201,9 +408,8 @@ async def process_video(client: Client, message: Message, update_cache: bool):
             cache_update_scheduled = True
             create_task(delayed_cache_update())
 
-    except FloodWait as e:
-        await sleep(e.value)
-        await message_queue.put((client, message))
+    except FloodWait:
+        raise
     except Exception as e:
         LOGGER.exception("Processing failed")
         await send_error(client, f"Processing failed: {str(e)}", e)
@@ -211,15 +417,15 @@ async def process_video(client: Client, message: Message, update_cache: bool):
 async def delayed_cache_update():
     global cache_update_scheduled
     await sleep(CACHE_DELAY)
-    await message_queue.join()
+    await join_queues()
     try:
+        await flush_writes()
         await update_all_caches()
     finally:
         cache_update_scheduled = False
 
 @Client.on_message(filters.chat(config.AUTH_CHATS))
 async def get_video(client: Client, message: Message):
-    await start_workers(update_cache=True)
     if message.video or message.document or message.animation:
-        await message_queue.put((client, message))
+        await enqueue(client, message, update_cache=True)
         LOGGER.info(f"Queued upload from {message.chat.id}")
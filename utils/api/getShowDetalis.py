@@ -1,26 +1,23 @@
 from typing import Dict, Any, List
+import asyncio
+import logging
 from utils.db_utils.show_db import ShowDatabase
 from utils.db_utils.bundle_db import BundleDatabase
+from utils.models.bundle_model import BundleSummaryList
 
+LOGGER = logging.getLogger(__name__)
 
-def get_show_details(sid: int) -> Dict[str, Any]:
+show_db = ShowDatabase()
+bundle_db = BundleDatabase()
+
+
+async def get_show_details(sid: int) -> Dict[str, Any]:
     """
     Retrieve show details by show ID (sid), including bundled episodes if available.
     """
     try:
         sid = int(sid)
         
-        db = ShowDatabase()
-        show = db.find_show_by_id(sid)
-
-        if not show:
-            return {
-                "status": "error",
-                "message": f"Show with ID {sid} not found"
-            }
-
-        result: Dict[str, Any] = {}
-        
         fields = [
             "title", "original_title", "release_date", "overview",
             "poster_path", "backdrop_path", "popularity", "vote_average",
@@ -28,49 +25,32 @@ def get_show_details(sid: int) -> Dict[str, Any]:
             "studios", "season", "total_episodes", "total_seasons",
             "status", "trailer"
         ]
-        
-        for field in fields:
-            if field in show:
-                result[field] = show[field]
+
+        # Field whitelist and episode sort both happen in MongoDB;
+        # the show and its bundles are fetched concurrently off the event loop
+        result, bundles = await asyncio.gather(
+            asyncio.to_thread(show_db.find_show_details, sid, fields),
+            asyncio.to_thread(bundle_db.get_bundles_for_show, sid)
+        )
+
+        if not result:
+            return {
+                "status": "error",
+                "message": f"Show with ID {sid} not found"
+            }
 
         result["id"] = int(sid)
         result["sid"] = int(sid)
 
-        if "season" in result and isinstance(result["season"], list):
-            for season in result["season"]:
-                if "episodes" in season and isinstance(season["episodes"], list):
-                    season["episodes"].sort(key=lambda x: x.get("episode_number", 0))
-
         # --- Bundle Logic ---
-        bundle_db = BundleDatabase()
-        bundles = bundle_db.get_bundles_for_show(sid)
-        
-        result["bundles"] = []
-        if bundles:
-            for bundle in bundles:
-                # Use HASH if available, otherwise fall back to ID
-                identifier = str(bundle.get("file_hash") or bundle.get("file_id", ""))
-
-                clean_bundle = {
-                    "title": str(bundle.get("title", "")),
-                    "season": int(bundle.get("season", 0)) if bundle.get("season") else None,
-                    "episode_range": str(bundle.get("episode_range", "")) if bundle.get("episode_range") else None,
-                    "file_id": identifier, 
-                    "chat_id": int(bundle.get("chat_id", 0)) if bundle.get("chat_id") else None,
-                    "msg_id": int(bundle.get("msg_id", 0)) if bundle.get("msg_id") else None,
-                    "is_bundle": bool(bundle.get("is_bundle", True)),
-                    "source": str(bundle.get("source", "telegram")),
-                    "note": str(bundle.get("note", "")),
-                    "show_id": int(bundle.get("show_id", 0)) if bundle.get("show_id") else None,
-                }
-                result["bundles"].append(clean_bundle)
+        result["bundles"] = BundleSummaryList.dump_python(
+            BundleSummaryList.validate_python(bundles or [])
+        )
         
         return result
 
-    except Exception as e:
-        import traceback
-        print(f"[ERROR] get_show_details failed: {e}")
-        print(traceback.format_exc())
+    except Exception:
+        LOGGER.exception("get_show_details failed for sid=%s", sid)
         return {
             "status": "error", 
             "message": "Internal server error"
@@ -1,59 +1,25 @@
 from typing import Dict, List, Any
 import asyncio
-import functools
 import re
 
+from pymongo.errors import OperationFailure
+
+from app import LOGGER
+from utils.async_lru import async_lru_cache
 from utils.db_utils.movie_db import MovieDatabase
 from utils.db_utils.show_db import ShowDatabase
 
 
-# =====================================================
-# ASYNC LRU CACHE (UNCHANGED FEATURE)
-# =====================================================
-def async_lru_cache(maxsize=100):
-    """Async-compatible LRU cache decorator."""
-    def decorator(fn):
-        cache = {}
-        cache_order = []
-
-        @functools.wraps(fn)
-        async def wrapper(*args, **kwargs):
-            key = str((args, frozenset(kwargs.items())))
-
-            if key in cache:
-                cache_order.remove(key)
-                cache_order.append(key)
-                return cache[key]
-
-            result = await fn(*args, **kwargs)
-            cache[key] = result
-            cache_order.append(key)
-
-            if len(cache_order) > maxsize:
-                oldest_key = cache_order.pop(0)
-                cache.pop(oldest_key, None)
-
-            return result
-
-        def cache_info():
-            return {"maxsize": maxsize, "currsize": len(cache)}
-
-        def cache_clear():
-            cache.clear()
-            cache_order.clear()
-
-        wrapper.cache_info = cache_info
-        wrapper.cache_clear = cache_clear
-        return wrapper
-
-    return decorator
-
-
 # =====================================================
 # PUBLIC CACHED SEARCH ENTRY
 # =====================================================
-@async_lru_cache(maxsize=100)
 async def get_cached_search_results(query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    # Matching and scoring are case-insensitive, so "Batman" and "batman " share an entry
+    return await _cached_search(" ".join(query.lower().split()), limit)
+
+
+@async_lru_cache(maxsize=100, ttl=300)
+async def _cached_search(query: str, limit: int) -> List[Dict[str, Any]]:
     return await search_all_media(query, limit)
 
 
@@ -78,14 +44,55 @@ async def search_all_media(query: str, limit: int = 20) -> List[Dict[str, Any]]:
 
 
 # =====================================================
-# MOVIE SEARCH (VPS SAFE – REGEX)
+# TITLE LOOKUP (TEXT INDEX, REGEX FALLBACK)
+# =====================================================
+# Collections whose text-index failure was already logged
+_text_index_missing = set()
+
+
+def find_by_title(collection, query: str, projection: Dict[str, Any], limit: int) -> List[Dict[str, Any]]:
+    """
+    Look titles up through the text index, best textScore first.
+    Partial words ("bat" for "Batman") have no text match, so an empty
+    result falls back to the old case-insensitive substring regex. So does
+    a missing (or still building) text index, which makes $text raise.
+    """
+    try:
+        items = list(
+            collection.find(
+                {"$text": {"$search": query}},
+                {**projection, "text_score": {"$meta": "textScore"}}
+            )
+            .sort([("text_score", {"$meta": "textScore"})])
+            .limit(limit)
+        )
+    except OperationFailure as e:
+        if collection.name not in _text_index_missing:
+            _text_index_missing.add(collection.name)
+            LOGGER.warning("Text search unavailable on %s, using regex: %s", collection.name, e)
+        items = []
+    else:
+        _text_index_missing.discard(collection.name)
+    if items:
+        return items
+
+    return list(
+        collection.find(
+            {"title": {"$regex": re.escape(query), "$options": "i"}},
+            projection
+        ).limit(limit)
+    )
+
+
+# =====================================================
+# MOVIE SEARCH
 # =====================================================
 async def search_movies(query: str, limit: int = 10) -> List[Dict[str, Any]]:
     movie_db = MovieDatabase()
-    escaped_query = re.escape(query)
 
-    cursor = movie_db.movies_collection.find(
-        {"title": {"$regex": escaped_query, "$options": "i"}},
+    items = find_by_title(
+        movie_db.movies_collection,
+        query,
         {
             "_id": 0,
             "mid": 1,
@@ -94,11 +101,12 @@ async def search_movies(query: str, limit: int = 10) -> List[Dict[str, Any]]:
             "release_date": 1,
             "vote_average": 1,
             "vote_count": 1,
-        }
-    ).limit(limit)
+        },
+        limit
+    )
 
     results = []
-    for item in cursor:
+    for item in items:
         year = None
         if item.get("release_date"):
             try:
@@ -121,14 +129,14 @@ async def search_movies(query: str, limit: int = 10) -> List[Dict[str, Any]]:
 
 
 # =====================================================
-# SHOW SEARCH (VPS SAFE – REGEX)
+# SHOW SEARCH
 # =====================================================
 async def search_shows(query: str, limit: int = 10) -> List[Dict[str, Any]]:
     show_db = ShowDatabase()
-    escaped_query = re.escape(query)
 
-    cursor = show_db.shows_collection.find(
-        {"title": {"$regex": escaped_query, "$options": "i"}},
+    items = find_by_title(
+        show_db.shows_collection,
+        query,
         {
             "_id": 0,
             "sid": 1,
@@ -137,11 +145,12 @@ async def search_shows(query: str, limit: int = 10) -> List[Dict[str, Any]]:
             "release_date": 1,
             "vote_average": 1,
             "vote_count": 1,
-        }
-    ).limit(limit)
+        },
+        limit
+    )
 
     results = []
-    for item in cursor:
+    for item in items:
         year = None
         if item.get("release_date"):
             try:
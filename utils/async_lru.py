@@ -0,0 +1,113 @@
+import asyncio
+import functools
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+
+class AsyncLRU:
+    """
+    LRU cache for a coroutine function.
+
+    Entries are the tasks running the wrapped call, so concurrent callers
+    with the same arguments share one call instead of each firing their
+    own. A call that raises (or is cancelled) is dropped from the cache.
+
+    With ttl, results are kept only that many seconds. With negative_ttl,
+    results of the form {"success": False, ...} are kept that long instead,
+    so misses are remembered without being pinned. key, if given, builds
+    the cache key from the call's arguments.
+    """
+
+    def __init__(
+        self,
+        fn,
+        maxsize: int = 128,
+        ttl: Optional[float] = None,
+        negative_ttl: Optional[float] = None,
+        key: Optional[Callable[..., Hashable]] = None,
+    ):
+        self.fn = fn
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.key = key
+        # key -> task, least recently used first
+        self._entries: "OrderedDict[Hashable, asyncio.Task]" = OrderedDict()
+        # key -> expiry of a cached result
+        self._expires: Dict[Hashable, float] = {}
+
+    def make_key(self, args: tuple, kwargs: dict) -> Hashable:
+        """key(*args, **kwargs) if set, else the arguments; repr() only if the key is unhashable"""
+        if self.key is not None:
+            key = self.key(*args, **kwargs)
+        else:
+            key = (args, tuple(sorted(kwargs.items()))) if kwargs else args
+        try:
+            hash(key)
+        except TypeError:
+            return repr(key)
+        return key
+
+    async def __call__(self, *args, **kwargs):
+        key = self.make_key(args, kwargs)
+
+        task = self._entries.get(key)
+        if task is not None and self._expires.get(key, float("inf")) <= time.monotonic():
+            self._remove(key)
+            task = None
+
+        if task is not None:
+            self._entries.move_to_end(key)
+        else:
+            task = asyncio.create_task(self.fn(*args, **kwargs))
+            task.add_done_callback(lambda t: self._on_done(key, t))
+            self._entries[key] = task
+            if len(self._entries) > self.maxsize:
+                evicted, _ = self._entries.popitem(last=False)
+                self._expires.pop(evicted, None)
+
+        # One caller being cancelled must not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _remove(self, key: Hashable):
+        self._entries.pop(key, None)
+        self._expires.pop(key, None)
+
+    def _on_done(self, key: Hashable, task: asyncio.Task):
+        if self._entries.get(key) is not task:
+            return
+        if task.cancelled() or task.exception() is not None:
+            self._remove(key)
+            return
+
+        result = task.result()
+        ttl = self.ttl
+        if self.negative_ttl is not None and isinstance(result, dict) and result.get("success") is False:
+            ttl = self.negative_ttl
+        if ttl is not None:
+            self._expires[key] = time.monotonic() + ttl
+
+    def cache_info(self) -> dict:
+        return {
+            "maxsize": self.maxsize,
+            "currsize": len(self._entries),
+            "ttl": self.ttl,
+            "negative_ttl": self.negative_ttl,
+        }
+
+    def cache_clear(self):
+        self._entries.clear()
+        self._expires.clear()
+
+
+def async_lru_cache(
+    maxsize: int = 128,
+    ttl: Optional[float] = None,
+    negative_ttl: Optional[float] = None,
+    key: Optional[Callable[..., Hashable]] = None,
+):
+    """Decorator form of AsyncLRU"""
+    def decorator(fn):
+        return functools.update_wrapper(AsyncLRU(fn, maxsize, ttl, negative_ttl, key), fn)
+    return decorator
@@ -13,11 +13,26 @@ BUNDLE_PATTERNS = [
     r"Complete\s+Web\s+Series",
 ]
 
+# All patterns as one alternation: a single scan per title
+_BUNDLE_RE = re.compile("|".join(f"(?:{p})" for p in BUNDLE_PATTERNS), re.IGNORECASE)
+
+_SEASON_RE = re.compile(r"(?:S|Season)\s*(\d+)", re.IGNORECASE)
+_RANGE_RE = re.compile(r"(?:E|Ep|Episodes?)\s*(\d+)\s*(?:-|to)\s*(?:E|Ep|Episodes?)?\s*(\d+)", re.IGNORECASE)
+
+# Title cleanup for the TMDB search
+_EXT_RE = re.compile(r"\.(?:mkv|mp4|avi|mov|webm)$", re.IGNORECASE)
+# Season marker (S01, Season 1) or episode range (E01-, Ep 1 to) and everything after
+_SE_TAIL_RE = re.compile(
+    r"(?:[._\s\[(]|^)(?:(?:S|Season)\s*\d+|(?:E|Ep|Episodes?)\s*\d+\s*[-to]).*$",
+    re.IGNORECASE,
+)
+_QUALITY_RE = re.compile(r"\b(?:480p|720p|1080p|2160p|4k|WEB-DL|BluRay)\b.*", re.IGNORECASE)
+
+# Separators become spaces, brackets are dropped
+_SEP_TABLE = str.maketrans({".": " ", "_": " ", "-": " ", "[": "", "]": "", "(": "", ")": ""})
+
 def is_bundle(title: str) -> bool:
-    for pattern in BUNDLE_PATTERNS:
-        if re.search(pattern, title, re.IGNORECASE):
-            return True
-    return False
+    return _BUNDLE_RE.search(title) is not None
 
 def extract_bundle_info(title: str) -> dict:
     """
@@ -32,13 +47,13 @@ def extract_bundle_info(title: str) -> dict:
     }
 
     # Extract season (Look for S01, Season 1, etc.)
-    season_match = re.search(r"(?:S|Season)\s*(\d+)", title, re.IGNORECASE)
+    season_match = _SEASON_RE.search(title)
     if season_match:
         info["season"] = int(season_match.group(1))
 
     # Extract episode range (E01-E10, 1-10, etc.)
     # Catches: E01-E05, 1-10, Ep 1 to 5
-    range_match = re.search(r"(?:E|Ep|Episodes?)\s*(\d+)\s*(?:-|to)\s*(?:E|Ep|Episodes?)?\s*(\d+)", title, re.IGNORECASE)
+    range_match = _RANGE_RE.search(title)
     if range_match:
         start = range_match.group(1)
         end = range_match.group(2)
@@ -48,18 +63,17 @@ def extract_bundle_info(title: str) -> dict:
     clean = title
     
     # 1. Remove file extensions
-    clean = re.sub(r'\.(mkv|mp4|avi|mov|webm)$', '', clean, flags=re.IGNORECASE)
+    clean = _EXT_RE.sub('', clean)
     
     # 2. Remove Season/Episode info and everything after
     # Matches: S01, E01-E05, Season 1, [01-10]
-    clean = re.sub(r'(?:[._\s\[(]|^)(?:S|Season)\s*\d+.*$', '', clean, flags=re.IGNORECASE)
-    clean = re.sub(r'(?:[._\s\[(]|^)(?:E|Ep|Episodes?)\s*\d+\s*[-to].*$', '', clean, flags=re.IGNORECASE)
+    clean = _SE_TAIL_RE.sub('', clean)
     
     # 3. Clean up separators
-    clean = clean.replace('.', ' ').replace('_', ' ').replace('-', ' ').replace('[', '').replace(']', '').replace('(', '').replace(')', '')
+    clean = clean.translate(_SEP_TABLE)
     
     # 4. Remove quality tags commonly found before season info (optional but safe)
-    clean = re.sub(r'\b(480p|720p|1080p|2160p|4k|WEB-DL|BluRay)\b.*', '', clean, flags=re.IGNORECASE)
+    clean = _QUALITY_RE.sub('', clean)
 
     # 5. Remove extra whitespace
     info["clean_title"] = ' '.join(clean.split()).strip()
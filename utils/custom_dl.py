@@ -6,6 +6,7 @@
 
 import asyncio
 import logging
+from collections import deque
 from pyrogram import utils, raw
 from pyrogram.errors import AuthBytesInvalid
 from pyrogram.file_id import FileId, FileType, ThumbnailSource
@@ -16,6 +17,9 @@ from utils.file_properties import get_file_ids
 from app import work_loads
 from pyrogram import Client, utils, raw
 
+# upload.GetFile requests kept in flight per stream
+PREFETCH_PARTS = 4
+
 
 class ByteStreamer:
     def __init__(self, client: Client):
@@ -41,6 +45,26 @@ class ByteStreamer:
         self.__file_properties_cache[cache_key] = file_id
         return file_id
 
+    async def fetch_part(self, media_session: Session, location, offset: int, chunk_size: int):
+        """One upload.GetFile request, retried with backoff on timeouts"""
+        max_retries = 3
+        retry_count = 0
+        retry_delay = 1  # Initial delay in seconds
+
+        while True:
+            try:
+                return await media_session.send(raw.functions.upload.GetFile(
+                    location=location, offset=offset, limit=chunk_size))
+            except TimeoutError:
+                retry_count += 1
+                if retry_count > max_retries:
+                    logging.error(f"Request timed out after {max_retries} retries at offset {offset}")
+                    raise  # Re-raise if we've exhausted retries
+
+                logging.warning(f"Request timed out, retrying ({retry_count}/{max_retries}) at offset {offset}")
+                await asyncio.sleep(retry_delay)
+                retry_delay *= 2  # Exponential backoff
+
     async def yield_file(self, file_id: FileId, index: int, offset: int, first_part_cut: int, last_part_cut: int, part_count: int, chunk_size: int) -> AsyncGenerator[bytes, None]:
         client = self.client
         work_loads[index] += 1
@@ -48,28 +72,18 @@ class ByteStreamer:
         media_session = await self.generate_media_session(client, file_id)
         current_part = 1
         location = await self.get_location(file_id)
+        # Parts requested ahead of the one being sent, in order
+        pending = deque()
+        next_offset = offset
         try:
             while current_part <= part_count:
-                # Retry logic for handling timeouts
-                max_retries = 3
-                retry_count = 0
-                retry_delay = 1  # Initial delay in seconds
-                
-                while True:
-                    try:
-                        r = await media_session.send(raw.functions.upload.GetFile(
-                            location=location, offset=offset, limit=chunk_size))
-                        break  # Success - exit retry loop
-                    except TimeoutError:
-                        retry_count += 1
-                        if retry_count > max_retries:
-                            logging.error(f"Request timed out after {max_retries} retries at offset {offset}")
-                            raise  # Re-raise if we've exhausted retries
-                        
-                        logging.warning(f"Request timed out, retrying ({retry_count}/{max_retries}) at offset {offset}")
-                        await asyncio.sleep(retry_delay)
-                        retry_delay *= 2  # Exponential backoff
-                
+                while len(pending) < PREFETCH_PARTS and current_part + len(pending) <= part_count:
+                    pending.append(asyncio.create_task(
+                        self.fetch_part(media_session, location, next_offset, chunk_size)))
+                    next_offset += chunk_size
+
+                r = await pending.popleft()
+
                 if isinstance(r, raw.types.upload.File):
                     chunk = r.bytes
                     if not chunk:
@@ -93,6 +107,9 @@ class ByteStreamer:
             logging.error(f"Error while streaming file: {e}")
             raise
         finally:
+            # Client went away or the stream ended early: drop prefetched parts
+            for task in pending:
+                task.cancel()
             logging.debug(f"Finished yielding file with {current_part-1} parts.")
             work_loads[index] -= 1
 
@@ -1,29 +1,53 @@
-from pymongo import MongoClient
+import logging
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, OperationFailure
 from typing import List, Dict, Any, Optional, Union
-import config
+from utils.db_utils.mongo_client import get_database
+
+LOGGER = logging.getLogger(__name__)
+
+# Fields the bundles route sends to the UI
+BUNDLE_SUMMARY_PROJECTION = {
+    "_id": 0, "title": 1, "season": 1, "episode_range": 1, "file_hash": 1,
+    "file_id": 1, "size": 1, "file_name": 1, "note": 1
+}
 
 class BundleDatabase:
     def __init__(self):
-        self.client = MongoClient(config.DATABASE_URL)
-        self.db = self.client["reelnnback"]
+        self.db = get_database("reelnnback")
         self.collection = self.db["bundles"]
 
-        # Indexes
-        self.collection.create_index("show_id")
+    def ensure_indexes(self):
+        """Create collection indexes (called once at startup)."""
+        # Covers get_bundles_for_show's filter and sort (and plain show_id lookups)
+        self.collection.create_index([("show_id", 1), ("is_bundle", 1), ("season", 1)])
         self.collection.create_index("title")
         self.collection.create_index("season")
-        self.collection.create_index("file_id", unique=True)
+        # Not unique: the same file can be reposted as another message, and
+        # upserts are keyed on (chat_id, msg_id). Replace the old unique index
+        file_id_index = self.collection.index_information().get("file_id_1")
+        if file_id_index and file_id_index.get("unique"):
+            self.collection.drop_index("file_id_1")
+        self.collection.create_index("file_id")
         # Used for secure short links
         self.collection.create_index("file_hash") 
+        # Duplicate check on ingest (not unique: older rows may repeat or be null)
+        self.collection.create_index("file_unique_id", sparse=True)
+        # One bundle per Telegram message; upserts are keyed on it
+        try:
+            self.collection.create_index([("chat_id", 1), ("msg_id", 1)], unique=True)
+        except OperationFailure as e:
+            LOGGER.warning("unique (chat_id, msg_id) index not built, duplicates exist: %s", e)
+            self.collection.create_index([("chat_id", 1), ("msg_id", 1)])
 
     def upsert_bundle(self, data: Dict[str, Any]) -> Dict[str, Any]:
-        """Insert or update a bundle by file_id"""
+        """Insert or update a bundle by its source message (chat_id, msg_id)"""
         try:
             if data.get("show_id") is not None:
                 data["show_id"] = int(data["show_id"])
                 
             result = self.collection.update_one(
-                {"file_id": data["file_id"]},
+                {"chat_id": data["chat_id"], "msg_id": data["msg_id"]},
                 {"$set": data},
                 upsert=True
             )
@@ -33,49 +57,116 @@ class BundleDatabase:
                 "modified": result.modified_count
             }
         except Exception as e:
-            print(f"[ERROR] upsert_bundle failed: {e}")
+            LOGGER.exception("upsert_bundle failed for chat_id=%s msg_id=%s", data.get("chat_id"), data.get("msg_id"))
             return {"status": "error", "message": str(e)}
 
-    def get_bundles_for_show(self, show_id: Optional[Union[int, str]]) -> List[Dict[str, Any]]:
+    def exists_by_unique_id(self, file_unique_id: str) -> bool:
+        """
+        Check whether a file is already stored as a bundle linked to a show.
+        Unlinked bundles (TMDB lookup failed) are reported as missing so
+        they get another chance when reprocessed.
+        """
+        return self.collection.count_documents(
+            {"file_unique_id": file_unique_id, "show_id": {"$ne": None}},
+            limit=1
+        ) > 0
+
+    def bulk_upsert_bundles(self, bundles: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
-        Get all bundles for a specific show_id.
+        Insert or update many bundles by (chat_id, msg_id) in a single round-trip.
+
+        Operations are unordered, so one rejected bundle does not stop the
+        rest: the result is "partial" and lists the rejected bundles under
+        "rejected". On any other error nothing is known to be written and
+        the status is "error".
+        """
+        # Last write wins for repeated messages, as with sequential upserts
+        latest: Dict[tuple, Dict[str, Any]] = {}
+        for data in bundles:
+            if data.get("show_id") is not None:
+                data["show_id"] = int(data["show_id"])
+            latest[(data["chat_id"], data["msg_id"])] = data
+
+        if not latest:
+            return {"status": "noop", "matched": 0, "modified": 0, "upserted": 0}
+
+        docs = list(latest.values())
+        ops = [
+            UpdateOne({"chat_id": data["chat_id"], "msg_id": data["msg_id"]}, {"$set": data}, upsert=True)
+            for data in docs
+        ]
+        try:
+            result = self.collection.bulk_write(ops, ordered=False)
+            return {
+                "status": "success",
+                "matched": result.matched_count,
+                "modified": result.modified_count,
+                "upserted": result.upserted_count
+            }
+        except BulkWriteError as e:
+            rejected = []
+            for error in e.details.get("writeErrors", []):
+                data = docs[error["index"]]
+                rejected.append(data)
+                LOGGER.error(
+                    "Bundle write rejected for chat_id=%s msg_id=%s: %s",
+                    data.get("chat_id"), data.get("msg_id"), error.get("errmsg")
+                )
+            return {
+                "status": "partial",
+                "matched": e.details.get("nMatched", 0),
+                "modified": e.details.get("nModified", 0),
+                "upserted": e.details.get("nUpserted", 0),
+                "rejected": rejected,
+                "message": f"{len(rejected)} of {len(docs)} bundle writes rejected"
+            }
+        except Exception as e:
+            LOGGER.exception("bulk_upsert_bundles failed for %d bundles", len(docs))
+            return {"status": "error", "message": str(e)}
+
+    def get_bundles_for_show(
+        self,
+        show_id: Optional[Union[int, str]],
+        projection: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get all bundles for a specific show_id (all fields but _id unless
+        a projection is given).
         """
         try:
             if show_id is None:
                 return []
-            
+
+            # show_id is stored as int, older rows may hold a string
+            candidates = [str(show_id)]
             try:
-                show_id_int = int(show_id)
-                cursor = self.collection.find(
-                    {"show_id": show_id_int, "is_bundle": True},
-                    {"_id": 0}
-                ).sort("season", 1)
-                bundles = list(cursor)
+                candidates.insert(0, int(show_id))
             except ValueError:
-                bundles = []
+                pass
 
-            if not bundles:
-                show_id_str = str(show_id)
-                cursor = self.collection.find(
-                    {"show_id": show_id_str, "is_bundle": True},
-                    {"_id": 0}
-                ).sort("season", 1)
-                bundles = list(cursor)
+            cursor = self.collection.find(
+                {"show_id": {"$in": candidates}, "is_bundle": True},
+                projection or {"_id": 0}
+            ).sort("season", 1)
+            bundles = list(cursor)
             
             return bundles
             
-        except Exception as e:
-            print(f"[ERROR] get_bundles_for_show failed: {e}")
+        except Exception:
+            LOGGER.exception("get_bundles_for_show failed for show_id=%s", show_id)
             return []
 
+    def get_bundle_summaries(self, show_id: Optional[Union[int, str]]) -> List[Dict[str, Any]]:
+        """
+        Get the UI fields of all bundles for a show, projected by MongoDB.
+        """
+        return self.get_bundles_for_show(show_id, BUNDLE_SUMMARY_PROJECTION)
+
     def get_bundle_by_hash_or_id(self, identifier: str) -> Optional[Dict[str, Any]]:
         """
-        Find a bundle by its file_hash (preferred) or file_id.
+        Find a bundle by its file_hash (short ID) or file_id (long ID).
+        A 6-char hash never equals a file_id, so one indexed $or is enough.
         """
-        # 1. Try Hash (Secure Short ID)
-        bundle = self.collection.find_one({"file_hash": identifier})
-        if bundle:
-            return bundle
-            
-        # 2. Fallback to File ID
-        return self.collection.find_one({"file_id": identifier})
+        return self.collection.find_one(
+            {"$or": [{"file_hash": identifier}, {"file_id": identifier}]}
+        )
@@ -1,15 +1,18 @@
 from pymongo import MongoClient
 from typing import Dict, List, Any, Optional
 from config import DATABASE_URL
+from utils.db_utils.mongo_client import mongo_client
 
 class ConfigDatabase:
     def __init__(self, connection_string: str = DATABASE_URL, db_name: str = "reelnnback"):
         """Initialize MongoDB connection."""
-        self.client = MongoClient(connection_string)
+        # Reuse the shared pool unless another server is requested
+        self.client = mongo_client if connection_string == DATABASE_URL else MongoClient(connection_string)
         self.db = self.client[db_name]
         self.config_collection = self.db["configs"]
-        
-        
+
+    def ensure_indexes(self):
+        """Create collection indexes (called once at startup)."""
         self.config_collection.create_index("key", unique=True)
     
     def upsert_config(self, key: str, value: Any, description: Optional[str] = None) -> Dict[str, Any]:
@@ -2,7 +2,13 @@ from pymongo import MongoClient
 from config import DATABASE_URL
 
 
-mongo_client = MongoClient(DATABASE_URL)
+# One pooled client per process, shared by every *Database class
+mongo_client = MongoClient(
+    DATABASE_URL,
+    maxPoolSize=100,
+    minPoolSize=5,
+    waitQueueTimeoutMS=2000,
+)
 
 
 def get_database(db_name):  
@@ -1,15 +1,35 @@
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
 from typing import Dict, List, Any, Optional
 from utils.db_utils.mongo_client import get_database
 
 
+# Metadata refreshed on every upsert; anything else is only written on insert
+MOVIE_UPDATE_FIELDS = [
+    "title", "original_title", "release_date", "overview", 
+    "poster_path", "backdrop_path", "popularity", 
+    "vote_average", "vote_count", "genres", "logo", 
+    "cast", "runtime", "directors", "links", "studios", 
+    "file_hash", "msg_id", "chat_id", "trailer"
+]
+
+
 class MovieDatabase:
     def __init__(self):
         """Initialize MongoDB connection."""
         db = get_database("reelnnback")
         self.movies_collection = db["movies"]
-        
+
+    def ensure_indexes(self):
+        """Create collection indexes (called once at startup)."""
         self.movies_collection.create_index("mid", unique=True)
+        # Lets has_file skip messages that were already ingested
+        self.movies_collection.create_index([("quality.chat_id", 1), ("quality.msg_id", 1)])
+        # Title search (utils/api/search_results.py)
+        self.movies_collection.create_index([("title", "text")])
+        # Sort keys for pagination (utils/api/pagination.py) and similar-by-genre
+        for field in ("vote_average", "release_date", "popularity"):
+            self.movies_collection.create_index([(field, -1)])
     
     def upsert_movie(self, movie_dict: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -30,16 +50,8 @@ class MovieDatabase:
             existing_movie = self.movies_collection.find_one({"mid": movie_id})
             
             if existing_movie:
-                fields_to_update = [
-                    "title", "original_title", "release_date", "overview", 
-                    "poster_path", "backdrop_path", "popularity", 
-                    "vote_average", "vote_count", "genres", "logo", 
-                    "cast", "runtime", "directors", "links", "studios", 
-                    "file_hash", "msg_id", "chat_id", "trailer"
-                ]
-                
                 update_doc = {}
-                for field in fields_to_update:
+                for field in MOVIE_UPDATE_FIELDS:
                     if field in movie_dict:
                         update_doc[field] = movie_dict[field]
                 
@@ -76,6 +88,77 @@ class MovieDatabase:
                 "message": str(e)
             }
     
+    def bulk_upsert_movies(self, movies: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Upsert many movies in one unordered bulk_write, with the same result
+        as calling upsert_movie for each: metadata fields are refreshed and
+        new quality entries are appended.
+        
+        Args:
+            movies: Movie dictionaries, several may share a mid
+            
+        Returns:
+            Dict with operation status and bulk_write counts; "partial" when
+            some ops were rejected, with their mids under "rejected"
+        """
+        try:
+            # One op per mid: qualities accumulate, the latest metadata wins
+            merged: Dict[int, Dict[str, Any]] = {}
+            for movie in movies:
+                movie_id = movie.get("mid")
+                if not movie_id:
+                    continue
+                if movie_id in merged:
+                    quality = merged[movie_id].get("quality", []) + movie.get("quality", [])
+                    merged[movie_id] = {**merged[movie_id], **movie, "quality": quality}
+                else:
+                    merged[movie_id] = dict(movie)
+
+            if not merged:
+                return {"status": "noop", "matched": 0, "modified": 0, "upserted": 0}
+
+            ops = []
+            for movie_id, movie in merged.items():
+                update_doc = {f: movie[f] for f in MOVIE_UPDATE_FIELDS if f in movie}
+                insert_doc = {
+                    k: v for k, v in movie.items()
+                    if k not in update_doc and k not in ("_id", "mid", "quality")
+                }
+                update: Dict[str, Any] = {"$push": {"quality": {"$each": movie.get("quality", [])}}}
+                if update_doc:
+                    update["$set"] = update_doc
+                if insert_doc:
+                    update["$setOnInsert"] = insert_doc
+                ops.append(UpdateOne({"mid": movie_id}, update, upsert=True))
+
+            result = self.movies_collection.bulk_write(ops, ordered=False)
+            return {
+                "status": "success",
+                "matched": result.matched_count,
+                "modified": result.modified_count,
+                "upserted": result.upserted_count
+            }
+        except BulkWriteError as e:
+            # Unordered: only the listed ops failed, the rest were written
+            movie_ids = list(merged)
+            rejected = [
+                {"mid": movie_ids[error["index"]], "message": error.get("errmsg")}
+                for error in e.details.get("writeErrors", [])
+            ]
+            return {
+                "status": "partial",
+                "matched": e.details.get("nMatched", 0),
+                "modified": e.details.get("nModified", 0),
+                "upserted": e.details.get("nUpserted", 0),
+                "rejected": rejected,
+                "message": f"{len(rejected)} of {len(ops)} movie writes rejected"
+            }
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": str(e)
+            }
+    
     def find_movie_by_id(self, movie_id: int) -> Optional[Dict[str, Any]]:
         """Find a movie by its ID."""
         try:
@@ -86,6 +169,13 @@ class MovieDatabase:
         except Exception as e:
             print(f"Error finding movie: {str(e)}")
             return None
+
+    def has_file(self, chat_id: int, msg_id: int) -> bool:
+        """Check whether a Telegram message is already stored as a movie quality."""
+        return self.movies_collection.count_documents(
+            {"quality": {"$elemMatch": {"chat_id": chat_id, "msg_id": msg_id}}},
+            limit=1
+        ) > 0
     
     def find_movies_by_title(self, title_query: str) -> List[Dict[str, Any]]:
         """Find movies by title (standard VPS-compatible regex search)."""
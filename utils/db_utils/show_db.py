@@ -2,13 +2,33 @@ from pymongo import MongoClient
 from typing import Dict, List, Any, Optional
 from utils.db_utils.mongo_client import get_database
 
+# Metadata refreshed on every upsert; anything else is only written on insert
+SHOW_UPDATE_FIELDS = [
+    "title", "original_title", "release_date", "overview", 
+    "poster_path", "backdrop_path", "popularity", 
+    "vote_average", "vote_count", "genres", "logo", "cast", 
+    "creators", "links", "studios", "file_hash", "msg_id", 
+    "chat_id", "total_seasons", "total_episodes", "status", "trailer"
+]
+
 class ShowDatabase:
     def __init__(self):
         """Initialize MongoDB connection."""
         db = get_database("reelnnback")
         self.shows_collection = db["shows"]
-        
+
+    def ensure_indexes(self):
+        """Create collection indexes (called once at startup)."""
         self.shows_collection.create_index("sid", unique=True)
+        # Lets has_file skip messages that were already ingested
+        self.shows_collection.create_index(
+            [("season.episodes.quality.chat_id", 1), ("season.episodes.quality.msg_id", 1)]
+        )
+        # Title search (utils/api/search_results.py)
+        self.shows_collection.create_index([("title", "text")])
+        # Sort keys for pagination (utils/api/pagination.py) and similar-by-genre
+        for field in ("vote_average", "release_date", "popularity"):
+            self.shows_collection.create_index([(field, -1)])
     
     def upsert_show(self, show_dict: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -29,16 +49,8 @@ class ShowDatabase:
             existing_show = self.shows_collection.find_one({"sid": show_id})
             
             if existing_show:
-                fields_to_update = [
-                    "title", "original_title", "release_date", "overview", 
-                    "poster_path", "backdrop_path", "popularity", 
-                    "vote_average", "vote_count", "genres", "logo", "cast", 
-                    "creators", "links", "studios", "file_hash", "msg_id", 
-                    "chat_id", "total_seasons", "total_episodes", "status", "trailer"
-                ]
-                
                 update_doc = {}
-                for field in fields_to_update:
+                for field in SHOW_UPDATE_FIELDS:
                     if field in show_dict:
                         update_doc[field] = show_dict[field]
                 
@@ -105,6 +117,48 @@ class ShowDatabase:
                 "message": str(e)
             }
     
+    def upsert_show_metadata(self, show_dict: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Insert a show or refresh its top-level metadata with a single
+        update_one. Seasons are left untouched on existing shows and start
+        empty on new ones.
+        
+        Args:
+            show_dict: Show-level data (no seasons needed)
+            
+        Returns:
+            Dict with operation status and show
+        """
+        show_id = show_dict.get("sid")
+        
+        if not show_id:
+            return {"status": "error", "message": "Show ID (sid) is required"}
+        
+        try:
+            update_doc = {f: show_dict[f] for f in SHOW_UPDATE_FIELDS if f in show_dict}
+            insert_doc = {
+                k: v for k, v in show_dict.items()
+                if k not in update_doc and k not in ("_id", "sid")
+            }
+            insert_doc.setdefault("season", [])
+
+            update: Dict[str, Any] = {"$setOnInsert": insert_doc}
+            if update_doc:
+                update["$set"] = update_doc
+
+            result = self.shows_collection.update_one({"sid": show_id}, update, upsert=True)
+            
+            return {
+                "status": "inserted" if result.upserted_id is not None else "updated",
+                "sid": show_id,
+                "modified_count": result.modified_count
+            }
+        except Exception as e:
+            return {
+                "status": "error",
+                "message": str(e)
+            }
+    
     def find_show_by_id(self, show_id: int) -> Optional[Dict[str, Any]]:
         """Find a show by its ID."""
         try:
@@ -115,6 +169,101 @@ class ShowDatabase:
         except Exception as e:
             print(f"Error finding show: {str(e)}")
             return None
+
+    def has_file(self, chat_id: int, msg_id: int) -> bool:
+        """Check whether a Telegram message is already stored as an episode quality."""
+        return self.shows_collection.count_documents(
+            {"season.episodes.quality": {"$elemMatch": {"chat_id": chat_id, "msg_id": msg_id}}},
+            limit=1
+        ) > 0
+    
+    def get_episode_file(self, show_id: int, season_number: int, episode_number: int, quality_index: int) -> Dict[str, Any]:
+        """
+        Resolve a single episode quality entry inside MongoDB.
+        
+        Args:
+            show_id: Show ID (sid)
+            season_number: Season number to look up
+            episode_number: Episode number within the season
+            quality_index: Index into the episode's quality list
+            
+        Returns:
+            Dict with status (success, show_not_found, season_not_found,
+            episode_not_found) and the matching quality entry as "file"
+        """
+        pipeline = [
+            {"$match": {"sid": int(show_id)}},
+            {"$project": {
+                "_id": 0,
+                "season": {"$first": {"$filter": {
+                    "input": {"$ifNull": ["$season", []]},
+                    "as": "s",
+                    "cond": {"$eq": ["$$s.season_number", int(season_number)]}
+                }}}
+            }},
+            {"$project": {
+                "has_season": {"$ne": [{"$ifNull": ["$season", None]}, None]},
+                "episode": {"$first": {"$filter": {
+                    "input": {"$ifNull": ["$season.episodes", []]},
+                    "as": "e",
+                    "cond": {"$eq": ["$$e.episode_number", int(episode_number)]}
+                }}}
+            }},
+            {"$project": {
+                "has_season": 1,
+                "has_episode": {"$ne": [{"$ifNull": ["$episode", None]}, None]},
+                "file": {"$arrayElemAt": [{"$ifNull": ["$episode.quality", []]}, int(quality_index)]}
+            }}
+        ]
+        
+        result = next(self.shows_collection.aggregate(pipeline), None)
+        
+        if result is None:
+            return {"status": "show_not_found"}
+        if not result.get("has_season"):
+            return {"status": "season_not_found"}
+        if not result.get("has_episode"):
+            return {"status": "episode_not_found"}
+        return {"status": "success", "file": result.get("file")}
+
+    def find_show_details(self, show_id: int, fields: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Fetch only the given fields of a show, with each season's episodes
+        sorted by episode_number inside MongoDB ($sortArray, MongoDB 5.2+).
+        
+        Args:
+            show_id: Show ID (sid)
+            fields: Top-level fields to return ("season" is always sorted)
+            
+        Returns:
+            Projected show document or None if not found
+        """
+        projection: Dict[str, Any] = {"_id": 0, "sid": 1}
+        projection.update({field: 1 for field in fields})
+        if "season" in fields:
+            projection["season"] = {"$cond": [
+                {"$isArray": "$season"},
+                {"$map": {
+                    "input": "$season",
+                    "as": "s",
+                    "in": {"$cond": [
+                        {"$isArray": "$$s.episodes"},
+                        {"$mergeObjects": ["$$s", {"episodes": {"$sortArray": {
+                            "input": "$$s.episodes",
+                            "sortBy": {"episode_number": 1}
+                        }}}]},
+                        "$$s"
+                    ]}
+                }},
+                "$season"
+            ]}
+
+        pipeline = [
+            {"$match": {"sid": int(show_id)}},
+            {"$limit": 1},
+            {"$project": projection}
+        ]
+        return next(self.shows_collection.aggregate(pipeline), None)
     
     def find_shows_by_title(self, title_query: str) -> List[Dict[str, Any]]:
         """Find shows by title (standard VPS-compatible regex search)."""
@@ -1,3 +1,5 @@
+import asyncio
+import copy
 import PTN
 from typing import Dict, Any, Optional, TypedDict, Union, List
 
@@ -22,6 +24,22 @@ class ContentResult(TypedDict):
     error: Optional[str]
 
 
+def quality_entry(message: Message, quality: str, media_info: Dict[str, Any]) -> Dict[str, Any]:
+    """Quality list item for the uploaded file, shared by movies and episodes"""
+    file = message.video or message.document or message.animation
+    return {
+        "type": quality,
+        "file_hash": file.file_unique_id[:6],
+        "msg_id": message.id,
+        "chat_id": message.chat.id,
+        "size": get_readable_file_size(file.file_size),
+        "audio": media_info.get("audio") or "N/A",
+        "video_codec": media_info.get("video_codec") or "N/A",
+        "file_type": media_info.get("file_type") or "N/A",
+        "subtitle": media_info.get("subtitle") or "N/A",
+    }
+
+
 # =========================
 # MOVIE
 # =========================
@@ -39,20 +57,9 @@ async def get_movie_details(
         quality, media_info = await media_quality(client, message)
         quality = quality or "720p"
 
-        file = message.video or message.document or message.animation
         data = tmdb["data"].copy()
 
-        data["quality"] = [{
-            "type": quality,
-            "file_hash": file.file_unique_id[:6],
-            "msg_id": message.id,
-            "chat_id": message.chat.id,
-            "size": get_readable_file_size(file.file_size),
-            "audio": media_info.get("audio") or "N/A",
-            "video_codec": media_info.get("video_codec") or "N/A",
-            "file_type": media_info.get("file_type") or "N/A",
-            "subtitle": media_info.get("subtitle") or "N/A",
-        }]
+        data["quality"] = [quality_entry(message, quality, media_info)]
 
         return {
             "success": True,
@@ -84,22 +91,13 @@ async def get_tv_details(
         quality, media_info = await media_quality(client, message)
         quality = quality or "720p"
 
-        file = message.video or message.document or message.animation
-        data = tmdb["data"].copy()
+        # Deep copy: the nested episode is edited below and tmdb is a cached result
+        data = copy.deepcopy(tmdb["data"])
 
         ep = data["season"][0]["episodes"][0]
-        ep["quality"] = [{
-            "type": quality,
-            "file_hash": file.file_unique_id[:6],
-            "msg_id": message.id,
-            "chat_id": message.chat.id,
-            "size": get_readable_file_size(file.file_size),
-            "audio": media_info.get("audio") or "N/A",
-            "video_codec": media_info.get("video_codec") or "N/A",
-            "file_type": media_info.get("file_type") or "N/A",
-            "subtitle": media_info.get("subtitle") or "N/A",
-            "runtime": ep.get("runtime"),
-        }]
+        entry = quality_entry(message, quality, media_info)
+        entry["runtime"] = ep.get("runtime")
+        ep["quality"] = [entry]
 
         return {
             "success": True,
@@ -134,6 +132,21 @@ async def get_tv_show_only(title: str) -> ContentResult:
         return {"success": False, "error": str(e), "data": None, "_type": None}
 
 
+# =========================
+# TITLE PARSING
+# =========================
+def _normalize_title(title: str) -> str:
+    return " ".join(title.replace("_", " ").replace("-", " ").split())
+
+
+def _parse_title(mtitle: str) -> Dict[str, Any]:
+    """PTN parse plus title cleanup; CPU-bound, run in the default executor"""
+    parsed = PTN.parse(mtitle)
+    if parsed.get("title"):
+        parsed["title"] = _normalize_title(parsed["title"])
+    return parsed
+
+
 # =========================
 # ENTRY POINT
 # =========================
@@ -145,11 +158,12 @@ async def get_content_details(
 
     LOGGER.info(f"Processing content: {mtitle}")
 
-    parsed = PTN.parse(mtitle)
+    loop = asyncio.get_running_loop()
+    parsed = await loop.run_in_executor(None, _parse_title, mtitle)
     if not parsed.get("title"):
         return {"success": False, "error": "Parse failed", "data": None, "_type": None}
 
-    title = " ".join(parsed["title"].replace("_", " ").replace("-", " ").split())
+    title = parsed["title"]
     year = parsed.get("year")
     season = parsed.get("season")
     episode: Union[int, List[int], None] = parsed.get("episode")
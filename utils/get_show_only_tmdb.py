@@ -1,27 +1,55 @@
 # utils/get_show_only_tmdb.py
 
-from utils.tmdb import tmdb
+import re
+from utils.async_lru import async_lru_cache
+from utils.tmdb import tmdb, tmdb_call
 from app import LOGGER
 
+SHOW_CACHE_SIZE = 1024
+SHOW_CACHE_TTL = 86400  # seconds a TMDB hit is reused
+NEGATIVE_CACHE_TTL = 600  # seconds a TMDB miss is remembered
+
+_TITLE_NOISE_RE = re.compile(
+    r"\b(?:(?:19|20)\d{2}|480p|720p|1080p|2160p|4k|web-?dl|web-?rip|bluray|hdrip|x264|x265|hevc)\b",
+    re.IGNORECASE,
+)
+
+
+def _normalize_title(title: str) -> str:
+    """Cache key: lowercase title without year/quality tokens"""
+    normalized = " ".join(_TITLE_NOISE_RE.sub(" ", title.lower()).split())
+    return normalized or " ".join(title.lower().split())
+
+
 async def fetch_tv_show_only_tmdb(title: str):
     """
     Fetch SHOW-LEVEL TMDB data only (NO seasons, NO episodes).
-    Safe for bundles.
+    Safe for bundles. Results are cached per normalized title.
     """
     if not title or not title.strip():
         LOGGER.warning("Empty title provided to fetch_tv_show_only_tmdb")
         return {"success": False, "error": "Empty title"}
 
+    return await _search_show_tmdb(title)
+
+
+@async_lru_cache(
+    maxsize=SHOW_CACHE_SIZE,
+    ttl=SHOW_CACHE_TTL,
+    negative_ttl=NEGATIVE_CACHE_TTL,
+    key=_normalize_title,
+)
+async def _search_show_tmdb(title: str):
     try:
-        LOGGER.debug(f"TMDB search for: '{title}'")
-        search = await tmdb.search().tv(query=title)
+        LOGGER.debug("TMDB search for: '%s'", title)
+        search = await tmdb_call(tmdb.search().tv, query=title)
 
         if not search or not search.results:
-            LOGGER.warning(f"No TMDB results for: '{title}'")
+            LOGGER.warning("No TMDB results for: '%s'", title)
             return {"success": False, "error": "Show not found"}
 
         show = search.results[0]
-        LOGGER.info(f"TMDB found: '{show.name}' (ID: {show.id})")
+        LOGGER.info("TMDB found: '%s' (ID: %s)", show.name, show.id)
 
         return {
             "success": True,
@@ -41,5 +69,5 @@ async def fetch_tv_show_only_tmdb(title: str):
         }
 
     except Exception as e:
-        LOGGER.error(f"Show-only TMDB error for '{title}': {e}")
+        LOGGER.error("Show-only TMDB error for '%s': %s", title, e)
         return {"success": False, "error": str(e)}
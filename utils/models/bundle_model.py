@@ -0,0 +1,37 @@
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, ValidationInfo, field_validator, model_validator
+from typing import Any, List, Optional
+
+class BundleSummary(BaseModel):
+    """Schema for a bundle as returned with show details."""
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    title: str = Field("", description="Bundle title")
+    season: Optional[int] = Field(None, description="Season number")
+    episode_range: Optional[str] = Field(None, description="Episode range (e.g., 'E01-E10')")
+    file_id: str = Field("", description="File hash, or file_id for legacy bundles")
+    chat_id: Optional[int] = Field(None, description="Chat ID for the file")
+    msg_id: Optional[int] = Field(None, description="Message ID for the file")
+    is_bundle: bool = Field(True, description="Always true for bundles")
+    source: str = Field("telegram", description="Where the bundle came from")
+    note: str = Field("", description="Detection note")
+    show_id: Optional[int] = Field(None, description="Linked show ID")
+
+    @model_validator(mode="before")
+    @classmethod
+    def use_hash_as_identifier(cls, data: Any) -> Any:
+        # Use HASH if available, otherwise fall back to ID
+        if isinstance(data, dict):
+            data = {**data, "file_id": data.get("file_hash") or data.get("file_id") or ""}
+        return data
+
+    @field_validator("season", "episode_range", "chat_id", "msg_id", "show_id", mode="before")
+    @classmethod
+    def empty_to_none(cls, value: Any) -> Any:
+        return value or None
+
+    @field_validator("title", "is_bundle", "source", "note", mode="before")
+    @classmethod
+    def none_to_default(cls, value: Any, info: ValidationInfo) -> Any:
+        return cls.model_fields[info.field_name].default if value is None else value
+
+BundleSummaryList = TypeAdapter(List[BundleSummary])
@@ -0,0 +1,76 @@
+import asyncio
+import time
+from collections import deque
+from pyrogram.errors import FloodWait
+import config
+
+
+class TokenBucket:
+    """
+    Sliding-window rate limiter shared by coroutines on one event loop.
+
+    Allows at most `burst` acquisitions in any window of `burst / rps`
+    seconds. After a penalty (e.g. a FloodWait) the allowance is halved
+    until the penalty expires.
+    """
+
+    def __init__(self, rps: float, burst: int):
+        self.rps = rps
+        self.burst = burst
+        self.window = burst / rps
+        self._calls = deque()
+        self._lock = asyncio.Lock()
+        self._penalty_until = 0.0
+
+    def _capacity(self, now: float) -> int:
+        if now < self._penalty_until:
+            return max(1, self.burst // 2)
+        return self.burst
+
+    async def acquire(self, cost: int = 1):
+        """Wait until `cost` calls fit in the current window, then record them."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= self.window:
+                    self._calls.popleft()
+
+                capacity = self._capacity(now)
+                cost = min(cost, capacity)
+                if len(self._calls) + cost <= capacity:
+                    self._calls.extend([now] * cost)
+                    return
+
+                await asyncio.sleep(self.window - (now - self._calls[0]))
+
+    def penalize(self, seconds: float):
+        """Halve the allowance for `seconds` (at least one window)."""
+        self._penalty_until = max(
+            self._penalty_until,
+            time.monotonic() + max(seconds, self.window)
+        )
+
+
+TG_BUCKET = TokenBucket(
+    rps=getattr(config, "TG_RATE_LIMIT", 25),
+    burst=getattr(config, "TG_RATE_BURST", 30),
+)
+
+# Most message ids one get_messages call accepts (Telegram's
+# messages.getMessages / channels.getMessages limit)
+GET_MESSAGES_LIMIT = 200
+
+
+async def tg_call(bucket: TokenBucket, func, *args, **kwargs):
+    """
+    Call a Telegram API coroutine function under the shared rate limit.
+
+    FloodWait is re-raised after penalizing the bucket so callers keep
+    their own retry/backoff handling.
+    """
+    await bucket.acquire()
+    try:
+        return await func(*args, **kwargs)
+    except FloodWait as e:
+        bucket.penalize(e.value)
+        raise
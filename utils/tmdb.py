@@ -1,9 +1,12 @@
 import asyncio
-import functools
+import time
 from typing import Dict, Any, Optional, TypedDict
+from aiohttp import ClientResponseError, ClientSession, ClientTimeout, TCPConnector
 from themoviedb import aioTMDb
 from app import LOGGER
 from utils.utils import get_official_trailer_url
+from utils.async_lru import async_lru_cache
+from utils.ratelimit import TokenBucket
 from config import TMDB_API_KEY
 
 # Assuming normalize_show_tmdb exists in your utils/helpers
@@ -11,35 +14,105 @@ from config import TMDB_API_KEY
 
 tmdb = aioTMDb(key=TMDB_API_KEY, language="en-US", region="US")
 
+# TMDb's documented limit was 40 requests / 10s; stay under it and cap
+# how many requests are open at once
+TMDB_BUCKET = TokenBucket(rps=4, burst=40)
+TMDB_MAX_CONCURRENCY = 20
+TMDB_MAX_RETRIES = 3
+# Seconds a "not found" (or failed) lookup is remembered
+TMDB_NEGATIVE_TTL = 600
+_tmdb_slots = asyncio.Semaphore(TMDB_MAX_CONCURRENCY)
+
+
+def open_tmdb_session() -> ClientSession:
+    """
+    Give the TMDb client one keep-alive session for the whole process.
+    Without one, themoviedb opens (and TLS-handshakes) a session per request.
+    raise_for_status matches the library's own per-request sessions.
+
+    Route objects (tmdb.movie(...), tmdb.search()) copy the session when
+    they are built, so this runs at startup, before the bot takes updates.
+    """
+    if tmdb.session is None or tmdb.session.closed:
+        tmdb.session = ClientSession(
+            connector=TCPConnector(limit=50, limit_per_host=20, ttl_dns_cache=300),
+            timeout=ClientTimeout(total=15),
+            raise_for_status=True,
+        )
+    return tmdb.session
+
+
+async def close_tmdb_session():
+    if tmdb.session is not None and not tmdb.session.closed:
+        await tmdb.session.close()
+
+
+def _retry_after(error: ClientResponseError, attempt: int) -> float:
+    """Seconds to wait after a 429: Retry-After if given, else exponential backoff"""
+    try:
+        return max(0.0, float(error.headers.get("Retry-After")))
+    except (AttributeError, TypeError, ValueError):
+        return float(2 ** attempt)
+
+
+async def tmdb_call(func, *args, **kwargs):
+    """
+    Call a TMDb coroutine function under the shared rate limit.
+
+    A 429 penalizes the bucket and is retried up to TMDB_MAX_RETRIES times;
+    other errors are raised to the caller as before.
+    """
+    for attempt in range(TMDB_MAX_RETRIES + 1):
+        async with _tmdb_slots:
+            await TMDB_BUCKET.acquire()
+            try:
+                return await func(*args, **kwargs)
+            except ClientResponseError as e:
+                if e.status != 429 or attempt == TMDB_MAX_RETRIES:
+                    raise
+                delay = _retry_after(e, attempt)
+                TMDB_BUCKET.penalize(delay)
+        LOGGER.warning("TMDb rate limited, retrying in %ss", delay)
+        await asyncio.sleep(delay)
+
+
 class TMDbResult(TypedDict):
     """Type definition for TMDb API results"""
     success: bool
     data: Optional[Dict[str, Any]]
     error: Optional[str]
 
-def async_lru_cache(maxsize=128, typed=False):
-    def decorator(fn):
-        _cache = {}
-        @functools.wraps(fn)
-        async def wrapper(*args, **kwargs):
-            key = str(args) + str(kwargs)
-            if key in _cache:
-                return _cache[key]
-            result = await fn(*args, **kwargs)
-            if len(_cache) >= maxsize:
-                _cache.pop(next(iter(_cache)))
-            _cache[key] = result
-            return result
-        return wrapper
-    return decorator
-
-@async_lru_cache(maxsize=100)
+
+GENRE_CACHE_TTL = 86400
+# Crew lists run to hundreds of entries; stop scanning after this many directors
+MAX_DIRECTORS = 5
+
+# (fetched_at, {genre id: name}); the list practically never changes
+_genre_cache = (0.0, {})
+_genre_lock = asyncio.Lock()
+
+
+async def get_movie_genre_map() -> Dict[int, str]:
+    """TMDb movie genre map, fetched at most once per GENRE_CACHE_TTL"""
+    global _genre_cache
+    async with _genre_lock:
+        fetched_at, genre_map = _genre_cache
+        if genre_map and time.monotonic() - fetched_at < GENRE_CACHE_TTL:
+            return genre_map
+
+        genre_data = await tmdb_call(tmdb.genres().movie)
+        genre_map = {g.id: g.name for g in genre_data.genres}
+        _genre_cache = (time.monotonic(), genre_map)
+        return genre_map
+
+
+@async_lru_cache(maxsize=500, negative_ttl=TMDB_NEGATIVE_TTL)
 async def fetch_movie_tmdb_data(title: str, year: Optional[int] = None) -> TMDbResult:
     """Fetch movie details from TMDb API"""
     try:
         try:
-            search = await tmdb.search().movies(query=title, year=year)
-            if not search or not hasattr(search, "results") or len(search.results) == 0:
+            search = await tmdb_call(tmdb.search().movies, query=title, year=year)
+            if not search or not getattr(search, "results", None):
                 return {
                     "success": False,
                     "data": None,
@@ -47,7 +120,7 @@ async def fetch_movie_tmdb_data(title: str, year: Optional[int] = None) -> TMDbR
                 }
             movie_id = search.results[0].id
         except Exception as e:
-            LOGGER.error(f"Error searching for movie '{title}': {str(e)}")
+            LOGGER.error("Error searching for movie '%s': %s", title, e)
             return {"success": False, "data": None, "error": f"Search error: {str(e)}"}
 
         movie_data = {
@@ -71,11 +144,25 @@ async def fetch_movie_tmdb_data(title: str, year: Optional[int] = None) -> TMDbR
             "links": [f"https://www.themoviedb.org/movie/{movie_id}"],
         }
 
+        # Independent lookups run concurrently; each one may fail on its own
+        movie = tmdb.movie(movie_id)
+        movie_details, logos, ext, genre_map, credits, videos = await asyncio.gather(
+            tmdb_call(movie.details),
+            tmdb_call(movie.images),
+            tmdb_call(movie.external_ids),
+            get_movie_genre_map(),
+            tmdb_call(movie.credits),
+            tmdb_call(movie.videos),
+            return_exceptions=True
+        )
+
         try:
-            movie_details = await tmdb.movie(movie_id).details()
+            if isinstance(movie_details, Exception):
+                raise movie_details
             movie_data["title"] = getattr(movie_details, "title", "")
             movie_data["original_title"] = getattr(movie_details, "original_title", "")
-            movie_data["release_date"] = str(movie_details.release_date) if hasattr(movie_details, "release_date") and movie_details.release_date else None
+            release_date = getattr(movie_details, "release_date", None)
+            movie_data["release_date"] = str(release_date) if release_date else None
             movie_data["overview"] = getattr(movie_details, "overview", "")
             movie_data["poster_path"] = getattr(movie_details, "poster_path", "") or ""
             movie_data["backdrop_path"] = getattr(movie_details, "backdrop_path", "") or ""
@@ -84,61 +171,67 @@ async def fetch_movie_tmdb_data(title: str, year: Optional[int] = None) -> TMDbR
             movie_data["vote_average"] = getattr(movie_details, "vote_average", 0)
             movie_data["vote_count"] = getattr(movie_details, "vote_count", 0)
             
-            companies = getattr(movie_details, "production_companies", [])
-            movie_data["studios"] = [getattr(c, "name", "") for c in companies if hasattr(c, "name")]
+            companies = getattr(movie_details, "production_companies", None) or []
+            movie_data["studios"] = [c.name for c in companies]
         except Exception as e:
-            LOGGER.warning(f"Error fetching movie details for '{title}': {str(e)}")
+            LOGGER.warning("Error fetching movie details for '%s': %s", title, e)
 
         try:
-            logos = await tmdb.movie(movie_id).images()
-            if hasattr(logos, "logos") and logos.logos:
-                en_logos = [l for l in logos.logos if getattr(l, "iso_639_1", "") == "en"]
-                in_logos = [l for l in logos.logos if getattr(l, "iso_639_1", "") == "in"]
+            if isinstance(logos, Exception):
+                raise logos
+            logo_list = getattr(logos, "logos", None)
+            if logo_list:
+                en_logos = [l for l in logo_list if l.iso_639_1 == "en"]
+                in_logos = [l for l in logo_list if l.iso_639_1 == "in"]
                 movie_data["logo"] = en_logos[0].file_path if en_logos else (in_logos[0].file_path if in_logos else "")
         except Exception as e:
-            LOGGER.warning(f"Error fetching logos: {e}")
+            LOGGER.warning("Error fetching logos: %s", e)
 
         try:
-            ext = await tmdb.movie(movie_id).external_ids()
             if getattr(ext, "imdb_id", None):
                 movie_data["links"].append(f"https://www.imdb.com/title/{ext.imdb_id}")
         except Exception: pass
 
         try:
-            genre_data = await tmdb.genres().movie()
-            genre_map = {g.id: g.name for g in genre_data.genres}
             g_ids = getattr(search.results[0], "genre_ids", [])
-            movie_data["genres"] = [genre_map.get(gid) for gid in g_ids if gid in genre_map]
+            # One lookup per id; genre names are never None
+            movie_data["genres"] = [name for name in map(genre_map.get, g_ids) if name is not None]
         except Exception: pass
 
         try:
-            credits = await tmdb.movie(movie_id).credits()
-            if hasattr(credits, "cast"):
-                movie_data["cast"] = [{"name": getattr(a, "name", ""), "imageUrl": getattr(a, "profile_path", "") or "", "character": getattr(a, "character", "") or ""} for a in credits.cast[:20]]
-            if hasattr(credits, "crew"):
-                movie_data["directors"] = [getattr(m, "name", "") for m in credits.crew if getattr(m, "job", "") == "Director"]
+            cast = getattr(credits, "cast", None)
+            if cast:
+                movie_data["cast"] = [{"name": a.name or "", "imageUrl": a.profile_path or "", "character": a.character or ""} for a in cast[:20]]
+            crew = getattr(credits, "crew", None)
+            if crew:
+                directors = movie_data["directors"]
+                for m in crew:
+                    if m.job == "Director":
+                        directors.append(m.name or "")
+                        if len(directors) >= MAX_DIRECTORS:
+                            break
         except Exception: pass
 
-        await asyncio.sleep(1)
         try:
-            videos = await tmdb.movie(movie_id).videos()
-            movie_data["trailer"] = get_official_trailer_url(videos) or ""
+            if not isinstance(videos, Exception):
+                movie_data["trailer"] = get_official_trailer_url(videos) or ""
         except Exception: pass
 
         return {"success": True, "data": movie_data, "error": None}
     except Exception as e:
-        LOGGER.error(f"Critical error: {e}")
+        LOGGER.error("Critical error: %s", e)
         return {"success": False, "data": None, "error": str(e)}
 
+@async_lru_cache(maxsize=500, negative_ttl=TMDB_NEGATIVE_TTL)
 async def fetch_tv_show_tmdb_data(title: str) -> dict:
     """Fetch SHOW-LEVEL TMDB data only"""
     try:
-        search = await tmdb.search().tv(query=title)
+        search = await tmdb_call(tmdb.search().tv, query=title)
         if not search or not search.results:
             return {"success": False, "error": "Show not found"}
         
         show_id = search.results[0].id
-        details = await tmdb.tv(show_id).details()
+        details = await tmdb_call(tmdb.tv(show_id).details)
         
         data = {
             "sid": show_id,
@@ -157,18 +250,20 @@ async def fetch_tv_show_tmdb_data(title: str) -> dict:
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+@async_lru_cache(maxsize=500, negative_ttl=TMDB_NEGATIVE_TTL)
 async def fetch_tv_tmdb_data(title: str, season: Optional[int] = None, episode: Optional[int] = None) -> TMDbResult:
     """Fetch TV show or Episode details from TMDb API"""
     try:
-        tv_search = await tmdb.search().tv(query=title)
+        tv_search = await tmdb_call(tmdb.search().tv, query=title)
         if not tv_search or not tv_search.results:
             return {"success": False, "data": None, "error": f"No TV show found for '{title}'"}
         
         tv_show_id = tv_search.results[0].id
+        tv = tmdb.tv(tv_show_id)
 
         # SHOW-LEVEL ONLY block
         if season is None or episode is None:
-            show_details = await tmdb.tv(tv_show_id).details()
+            show_details = await tmdb_call(tv.details)
             # Note: Ensure normalize_show_tmdb is defined/imported
             return {"success": True, "data": locals().get('normalize_show_tmdb', lambda x: x)(show_details), "error": None}
 
@@ -198,8 +293,15 @@ async def fetch_tv_tmdb_data(title: str, season: Optional[int] = None, episode:
             "season": [{"season_number": int(season), "episodes": [{"episode_number": int(episode), "name": "", "runtime": 0, "overview": "", "still_path": "", "air_date": None}]}],
         }
 
+        details, ep = await asyncio.gather(
+            tmdb_call(tv.details),
+            tmdb_call(tmdb.episode(tv_show_id, season, episode).details),
+            return_exceptions=True
+        )
+
         try:
-            details = await tmdb.tv(tv_show_id).details()
+            if isinstance(details, Exception):
+                raise details
             tv_data.update({
                 "title": getattr(details, "name", ""),
                 "total_seasons": len(getattr(details, "seasons", [])),
@@ -213,20 +315,22 @@ async def fetch_tv_tmdb_data(title: str, season: Optional[int] = None, episode:
         except Exception: pass
 
         try:
-            ep = await tmdb.episode(tv_show_id, season, episode).details()
+            if isinstance(ep, Exception):
+                raise ep
             target = tv_data["season"][0]["episodes"][0]
+            air_date = getattr(ep, "air_date", None)
             target.update({
                 "name": getattr(ep, "name", ""),
                 "runtime": int(getattr(ep, "runtime", 0) or 0),
                 "overview": getattr(ep, "overview", ""),
                 "still_path": getattr(ep, "still_path", "") or "",
-                "air_date": str(ep.air_date) if hasattr(ep, "air_date") and ep.air_date else None
+                "air_date": str(air_date) if air_date else None
             })
             tv_data["still_path"] = target["still_path"]
         except Exception as e:
-            LOGGER.warning(f"Episode error: {e}")
+            LOGGER.warning("Episode error: %s", e)
 
         return {"success": True, "data": tv_data, "error": None}
     except Exception as e:
-        LOGGER.error(f"TV API error: {e}")
+        LOGGER.error("TV API error: %s", e)
         return {"success": False, "data": None, "error": str(e)}
\ No newline at end of file
@@ -1,17 +1,19 @@
 from typing import List, Optional
 from fastapi import FastAPI, Query, Request, HTTPException, Form, Depends
-from fastapi.responses import JSONResponse, HTMLResponse, StreamingResponse
+from fastapi.responses import ORJSONResponse, HTMLResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import APIKeyQuery
 from fastapi.staticfiles import StaticFiles
 import jwt
 from datetime import datetime
 from pathlib import Path
-import math
 import secrets
 import mimetypes
 import time
 import asyncio
+import heapq
+import re
+from collections import OrderedDict
 from contextlib import asynccontextmanager
 
 from utils.db_utils.config_db import ConfigDatabase
@@ -35,8 +37,45 @@ from state import work_loads, multi_clients
 from app import LOGGER
 from config import SITE_SECRET
 
-app = FastAPI()
-class_cache = {}
+async def ensure_indexes():
+    """Create every collection's indexes in parallel, off the event loop"""
+    results = await asyncio.gather(
+        *(asyncio.to_thread(db.ensure_indexes) for db in (movie_db, show_db, bundle_db, ConfigDatabase())),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            LOGGER.error("Index creation failed: %s", result)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Index builds are checked once here instead of on every *Database().
+    # They run in the background, so the server starts serving right away.
+    # Until an index is ready, most queries just run without it (slower);
+    # $text title search errors instead, and find_by_title falls back to a
+    # regex search meanwhile
+    index_task = asyncio.create_task(ensure_indexes())
+    cache_cleaner_task = asyncio.create_task(periodic_cache_cleanup())
+    yield
+    cache_cleaner_task.cancel()
+    try:
+        await cache_cleaner_task
+    except asyncio.CancelledError:
+        pass
+    if not index_task.done():
+        LOGGER.warning("Shutting down before index creation finished")
+
+async def periodic_cache_cleanup():
+    while True:
+        await asyncio.sleep(900)  # 15 minutes
+        clean_cache()
+        LOGGER.debug(f"Cache cleaned. Items remaining: {len(class_cache)}")
+
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+class_cache: dict[int, dict] = {}
+CLASS_CACHE_TTL = 3600
+# (expires_at, client index) per class_cache insert, soonest first
+_class_cache_expiry: list[tuple[float, int]] = []
 token_query = APIKeyQuery(name="token", auto_error=False)
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -46,6 +85,10 @@ static_dir.mkdir(exist_ok=True)
 templates_dir = BASE_DIR / "templates"
 templates_dir.mkdir(exist_ok=True)
 
+# Served on every page load; read once instead of per request
+_LOGIN_HTML = (templates_dir / "login.html").read_bytes()
+_INDEX_HTML = (templates_dir / "index.html").read_bytes()
+
 app.include_router(show_bundles_router, prefix="/api/v1")
 app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
 
@@ -62,31 +105,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    cache_cleaner_task = asyncio.create_task(periodic_cache_cleanup())
-    yield
-    cache_cleaner_task.cancel()
-    try:
-        await cache_cleaner_task
-    except asyncio.CancelledError:
-        pass
-
-async def periodic_cache_cleanup():
-    while True:
-        await asyncio.sleep(900)  # 15 minutes
-        clean_cache()
-        LOGGER.debug(f"Cache cleaned. Items remaining: {len(class_cache)}")
+_SITE_KEY = SITE_SECRET.encode()
+STREAM_TOKEN_CACHE_SIZE = 2048
+STREAM_TOKEN_CACHE_TTL = 3600  # upper bound for tokens without an expiry
+# raw token -> (valid_until, payload); one stream sends many range
+# requests with the same token, only the first is decoded
+_STREAM_TOKEN_CACHE: "OrderedDict[str, tuple]" = OrderedDict()
 
 def verify_stream_token(token: str):
+    now = datetime.now().timestamp()
+    cached = _STREAM_TOKEN_CACHE.get(token)
+    if cached is not None:
+        if cached[0] > now:
+            _STREAM_TOKEN_CACHE.move_to_end(token)
+            return cached[1]
+        del _STREAM_TOKEN_CACHE[token]
+
     try:
-        decoded = jwt.decode(token, SITE_SECRET, algorithms=["HS256"])
-        if "expiry" in decoded and decoded["expiry"] < datetime.now().timestamp():
+        decoded = jwt.decode(token, _SITE_KEY, algorithms=["HS256"])
+        if "expiry" in decoded and decoded["expiry"] < now:
             raise HTTPException(status_code=401, detail="Token has expired")
-        return decoded
     except jwt.PyJWTError as e:
         raise HTTPException(status_code=401, detail=f"Invalid token: {str(e)}")
 
+    valid_until = now + STREAM_TOKEN_CACHE_TTL
+    for claim in ("expiry", "exp"):
+        if isinstance(decoded.get(claim), (int, float)):
+            valid_until = min(valid_until, decoded[claim])
+    _STREAM_TOKEN_CACHE[token] = (valid_until, decoded)
+    if len(_STREAM_TOKEN_CACHE) > STREAM_TOKEN_CACHE_SIZE:
+        _STREAM_TOKEN_CACHE.popitem(last=False)
+    return decoded
+
 # --- Auth Routes ---
 
 @app.post("/api/v1/login")
@@ -100,8 +150,7 @@ async def login(username: str = Form(...), password: str = Form(...)):
 @app.get("/login", response_class=HTMLResponse)
 async def login_page():
     """Serve the login page."""
-    with open(templates_dir / "login.html") as f:
-        return HTMLResponse(content=f.read())
+    return HTMLResponse(content=_LOGIN_HTML)
 
 @app.get("/api/v1/auth-check")
 async def auth_check(token_data: dict = Depends(verify_token)):
@@ -113,32 +162,31 @@ async def auth_check(token_data: dict = Depends(verify_token)):
 @app.get("/", response_class=HTMLResponse)
 async def get_index():
     """Serve the admin interface"""
-    with open(templates_dir / "index.html") as f:
-        return HTMLResponse(content=f.read())
+    return HTMLResponse(content=_INDEX_HTML)
 
 @app.get("/api/v1/heroslider")
 async def get_hero_slider(request: Request):
     items = get_hero_slider_items()
-    return JSONResponse(content=items)
+    return ORJSONResponse(items)
 
 @app.get("/api/v1/getlatest/{media_type}")
 async def get_latest(media_type: str, limit: int = Query(21, gt=0)):
     items = get_latest_entries(media_type, limit)
-    return JSONResponse(content=items)
+    return ORJSONResponse(items)
 
 @app.get("/api/v1/getMovieDetails/{mid}")
 async def getmovie_details(mid: str):
     details = get_movie_details(mid)
     if not details:
         raise HTTPException(status_code=404, detail="Movie not found")
-    return JSONResponse(content=details)
+    return ORJSONResponse(details)
 
 @app.get("/api/v1/getShowDetails/{sid}")
 async def getshow_details(sid: str):
-    details = get_show_details(sid)
+    details = await get_show_details(sid)
     if not details:
         raise HTTPException(status_code=404, detail="Show not found")
-    return JSONResponse(content=details)
+    return ORJSONResponse(details)
 
 @app.get("/api/v1/paginated/{media_type}")
 async def get_paginated(
@@ -150,13 +198,13 @@ async def get_paginated(
     response = get_paginated_entries(media_type, page, items_per_page, sort_by)
     if "status" in response and response["status"] == "error":
         raise HTTPException(status_code=400, detail=response["message"])
-    return JSONResponse(content=response)
+    return ORJSONResponse(response)
 
 @app.get("/api/v1/trending")
 async def get_trending_items():
     try:
         result = get_trending_entries()
-        return JSONResponse(content=result)
+        return ORJSONResponse(result)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -176,7 +224,7 @@ async def update_trending(request: Request, token: str = Depends(token_query)):
         if save_result["status"] in ["inserted", "updated"]:
             update_trending_cache()
             result = get_trending_entries({"movie": movie_ids, "show": show_ids})
-            return JSONResponse(content={"status": "success", "data": result})
+            return ORJSONResponse({"status": "success", "data": result})
         else:
             raise Exception(save_result.get('message', 'Unknown error'))
     except Exception as e:
@@ -193,7 +241,7 @@ async def get_similar_media(
         raise HTTPException(status_code=400, detail="Must provide 1-2 genre keywords")
     try:
         results = get_similar_by_genre(media_type, genres)
-        return JSONResponse(content=results or [])
+        return ORJSONResponse(results or [])
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -203,14 +251,55 @@ async def search_all(
     limit: int = Query(20, ge=1, le=50, description="Maximum results per media type"),
 ):
     if len(query) < 2:
-        return JSONResponse(content=[])
+        return ORJSONResponse([])
     try:
         results = await get_cached_search_results(query, limit)
-        return JSONResponse(content=results)
+        return ORJSONResponse(results)
     except Exception as e:
         LOGGER.error(f"Search error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+STREAM_CHUNK_SIZE = 1024 * 1024
+# "bytes=<from>-[<until>]"; anything else (suffix or multi ranges) gets a 416
+_RANGE_RE = re.compile(r"bytes=(\d+)-(\d*)\s*$")
+BUNDLE_CACHE_SIZE = 4096
+# bundle hash/file id -> (chat_id, msg_id, secure_hash); bundles never move,
+# so the many range requests of one stream skip MongoDB after the first
+_BUNDLE_CACHE: "OrderedDict[str, tuple]" = OrderedDict()
+
+async def lookup_bundle(id: str) -> tuple:
+    """Resolve a bundle hash/file id to (chat_id, msg_id, secure_hash)"""
+    cached = _BUNDLE_CACHE.get(id)
+    if cached is not None:
+        _BUNDLE_CACHE.move_to_end(id)
+        return cached
+
+    LOGGER.info(f"Looking up bundle for hash/id: {id}")
+    
+    # Hash (Short ID) or File ID (Long ID), off the event loop
+    bundle = await asyncio.to_thread(bundle_db.get_bundle_by_hash_or_id, id)
+    
+    if not bundle:
+         LOGGER.error(f"Bundle not found in DB for: {id}")
+         raise HTTPException(status_code=404, detail="Bundle file not found")
+    
+    msg_id = int(bundle.get("msg_id"))
+    chat_id = int(bundle.get("chat_id"))
+    
+    # SECURITY FIX: Retrieve the Secure Hash from DB
+    secure_hash = bundle.get("file_hash")
+    
+    if not secure_hash:
+        # Compatibility Mode: If legacy bundle has no hash, we Log it but Allow it.
+        # Passing None to media_streamer skips the hash check (Original behavior for bundles)
+        LOGGER.warning(f"Bundle {id} has no hash in DB. Integrity check skipped (Legacy Support).")
+        secure_hash = None 
+
+    entry = _BUNDLE_CACHE[id] = (chat_id, msg_id, secure_hash)
+    if len(_BUNDLE_CACHE) > BUNDLE_CACHE_SIZE:
+        _BUNDLE_CACHE.popitem(last=False)
+    return entry
+
 # --- Streaming Handler (SECURE) ---
 
 @app.get("/api/v1/dl/{id}")
@@ -263,31 +352,7 @@ async def stream_handler(
     try:
         # Handle Bundle/Direct File Request
         if is_bundle:
-            LOGGER.info(f"Looking up bundle for hash/id: {id}")
-            
-            # 1. Look up by HASH first (Short ID)
-            bundle = bundle_db.collection.find_one({"file_hash": id})
-            
-            # 2. Fallback to File ID (Long ID)
-            if not bundle:
-                bundle = bundle_db.collection.find_one({"file_id": id})
-            
-            if not bundle:
-                 LOGGER.error(f"Bundle not found in DB for: {id}")
-                 raise HTTPException(status_code=404, detail="Bundle file not found")
-            
-            msg_id = int(bundle.get("msg_id"))
-            chat_id = int(bundle.get("chat_id"))
-            
-            # SECURITY FIX: Retrieve the Secure Hash from DB
-            secure_hash = bundle.get("file_hash")
-            
-            if not secure_hash:
-                # Compatibility Mode: If legacy bundle has no hash, we Log it but Allow it.
-                # Passing None to media_streamer skips the hash check (Original behavior for bundles)
-                LOGGER.warning(f"Bundle {id} has no hash in DB. Integrity check skipped (Legacy Support).")
-                secure_hash = None 
-
+            chat_id, msg_id, secure_hash = await lookup_bundle(id)
             return await media_streamer(request, chat_id, msg_id, secure_hash=secure_hash)
 
         # Handle Standard Movie/Show Request
@@ -322,31 +387,35 @@ async def media_streamer(request: Request, chat_id: int, id: int, secure_hash: s
         LOGGER.warning("No clients available in work_loads dictionary")
 
     index = min(work_loads, key=work_loads.get)
-    faster_client = multi_clients[index]
 
     if index not in multi_clients:
-        LOGGER.error(f"Client index {index} not found in multi_clients")
+        LOGGER.error("Client index %s not found in multi_clients", index)
         raise HTTPException(status_code=503, detail="Streaming client configuration error")
 
-    LOGGER.debug(f"Client {index} serving {request.client.host}")
+    LOGGER.debug("Client %s serving %s", index, request.client.host)
 
-    if faster_client in class_cache:
-        tg_connect = class_cache[faster_client]["object"]
+    # Keyed by client index: a plain int instead of hashing the Client object
+    cached = class_cache.get(index)
+    if cached is not None:
+        tg_connect = cached["object"]
     else:
-        tg_connect = ByteStreamer(faster_client)
-        class_cache[faster_client] = {"object": tg_connect, "timestamp": time.time()}
+        tg_connect = ByteStreamer(multi_clients[index])
+        now = time.time()
+        class_cache[index] = {"object": tg_connect, "timestamp": now}
+        heapq.heappush(_class_cache_expiry, (now + CLASS_CACHE_TTL, index))
 
     try:
         file_id = await tg_connect.get_file_properties(chat_id=chat_id, message_id=id)
     except Exception as e:
-        LOGGER.error(f"Error getting file properties: {str(e)}")
+        LOGGER.error("Error getting file properties: %s", e)
         raise HTTPException(status_code=500, detail=f"Error retrieving file: {str(e)}")
 
     # SECURITY CHECK: Verify File Integrity
     if secure_hash:
         # Check first 6 chars of unique_id against our DB hash
-        if file_id.unique_id[:6] != secure_hash:
-            LOGGER.critical(f"Hash Mismatch! Expected: {secure_hash}, Got: {file_id.unique_id[:6]}")
+        file_hash = file_id.unique_id[:6]
+        if file_hash != secure_hash:
+            LOGGER.critical("Hash Mismatch! Expected: %s, Got: %s", secure_hash, file_hash)
             # This prevents streaming if the file was swapped/changed
             raise InvalidHash
     else:
@@ -354,9 +423,12 @@ async def media_streamer(request: Request, chat_id: int, id: int, secure_hash: s
 
     file_size = file_id.file_size
     if range_header:
-        from_bytes, until_bytes = range_header.replace("bytes=", "").split("-")
-        from_bytes = int(from_bytes)
-        until_bytes = int(until_bytes) if until_bytes else file_size - 1
+        range_match = _RANGE_RE.match(range_header)
+        if range_match:
+            from_bytes = int(range_match.group(1))
+            until_bytes = int(range_match.group(2)) if range_match.group(2) else file_size - 1
+        else:
+            from_bytes = until_bytes = -1  # unparsable, answered with 416 below
     else:
         from_bytes = 0
         until_bytes = file_size - 1
@@ -368,14 +440,16 @@ async def media_streamer(request: Request, chat_id: int, id: int, secure_hash: s
             headers={"Content-Range": f"bytes */{file_size}"},
         )
         
-    chunk_size = min(1024 * 1024, file_size // 10)
+    # Telegram's largest part; a power of two, so offsets are a mask away
+    chunk_size = STREAM_CHUNK_SIZE
     until_bytes = min(until_bytes, file_size - 1)
     
-    offset = from_bytes - (from_bytes % chunk_size)
+    offset = from_bytes & ~(chunk_size - 1)
     first_part_cut = from_bytes - offset
     last_part_cut = until_bytes % chunk_size + 1
     req_length = until_bytes - from_bytes + 1
-    part_count = math.ceil(until_bytes / chunk_size) - math.floor(offset / chunk_size)
+    # Parts covering offset..until_bytes inclusive
+    part_count = (until_bytes - offset) // chunk_size + 1
 
     body = tg_connect.yield_file(
         file_id, index, offset, first_part_cut, last_part_cut, part_count, chunk_size
@@ -410,7 +484,11 @@ async def media_streamer(request: Request, chat_id: int, id: int, secure_hash: s
     )
 
 def clean_cache():
+    """Drop expired class_cache entries; only due heap entries are visited"""
     current_time = time.time()
-    expired_keys = [k for k, v in class_cache.items() if current_time - v["timestamp"] > 3600]
-    for key in expired_keys:
-        del class_cache[key]
+    while _class_cache_expiry and _class_cache_expiry[0][0] <= current_time:
+        _, key = heapq.heappop(_class_cache_expiry)
+        entry = class_cache.get(key)
+        # A re-created entry has its own, later heap item
+        if entry is not None and current_time - entry["timestamp"] >= CLASS_CACHE_TTL:
+            del class_cache[key]